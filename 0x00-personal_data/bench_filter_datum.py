@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of filter_datum and RedactingFormatter against the
+previous implementation (pattern rebuilt and recompiled on every call),
+on 8-field records shaped like the ones logged by filtered_logger.main.
+"""
+
+import logging
+import re
+import timeit
+from typing import List
+
+from filtered_logger import PII_FIELDS, RedactingFormatter, filter_datum
+
+
+RECORDS = 10000
+MESSAGE = (
+    'name=Marlene Wood; email=hwestiii@att.net; phone=(473) 401-4253; '
+    'ssn=261-72-6780; password=K5?BMNv; ip=60ed:c396:2ff:244:bbd0:9208:'
+    '26f2:93ea; last_login=2019-11-14 06:14:24; user_agent=Mozilla/5.0;'
+)
+CLEAN_MESSAGE = 'ip=60ed:c396:2ff:244; last_login=2019-11-14 06:14:24;'
+
+
+def legacy_filter_datum(
+        fields: List[str], redaction: str, message: str, separator: str
+        ) -> str:
+    """ filter_datum as it was before the pattern cache. """
+    pattrn = r'(' + '|'.join(fields) + r')=([^' + re.escape(separator) + r']+)'
+    return re.sub(
+            pattrn, lambda match: f'{match.group(1)}={redaction}', message)
+
+
+class LegacyRedactingFormatter(RedactingFormatter):
+    """ RedactingFormatter as it was before the pattern cache. """
+
+    def format(self, record: logging.LogRecord) -> str:
+        formatted_message = logging.Formatter.format(self, record)
+        return legacy_filter_datum(self.fields, self.REDACTION,
+                                   formatted_message, self.SEPARATOR)
+
+
+def bench(label: str, func) -> None:
+    """ Prints the time per record of func, best of 5 runs. """
+    best = min(timeit.repeat(func, number=RECORDS, repeat=5))
+    print(f'{label:<42} {best / RECORDS * 1e6:8.2f} us/record')
+
+
+def main():
+    """ Runs the benchmarks. """
+    fields = list(PII_FIELDS)
+    assert (filter_datum(fields, '***', MESSAGE, ';')
+            == legacy_filter_datum(fields, '***', MESSAGE, ';'))
+
+    record = logging.LogRecord('user_data', logging.INFO, None, None,
+                               MESSAGE, None, None)
+    clean_record = logging.LogRecord('user_data', logging.INFO, None, None,
+                                     CLEAN_MESSAGE, None, None)
+    formatter = RedactingFormatter(fields)
+    legacy_formatter = LegacyRedactingFormatter(fields)
+
+    bench('legacy filter_datum',
+          lambda: legacy_filter_datum(fields, '***', MESSAGE, ';'))
+    bench('filter_datum',
+          lambda: filter_datum(fields, '***', MESSAGE, ';'))
+    bench('legacy RedactingFormatter.format',
+          lambda: legacy_formatter.format(record))
+    bench('RedactingFormatter.format',
+          lambda: formatter.format(record))
+    bench('legacy RedactingFormatter.format (no PII)',
+          lambda: legacy_formatter.format(clean_record))
+    bench('RedactingFormatter.format (no PII)',
+          lambda: formatter.format(clean_record))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@
 This module provides a function to hash a password using bcrypt.
 """
 
-import bcrypt
+from hashing_service import get_hashing_service
 
 
 def hash_password(password: str) -> bytes:
@@ -17,7 +17,7 @@ def hash_password(password: str) -> bytes:
         bytearray: The hashed password as a bytearray.
     """
 
-    hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    hashed_password = get_hashing_service().hash_password(password)
     return hashed_password
 
 
@@ -34,7 +34,7 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
         False otherwise.
     """
 
-    if bcrypt.checkpw(password.encode(), hashed_password):
+    if get_hashing_service().check_password(password, hashed_password):
         return True
 
     return False
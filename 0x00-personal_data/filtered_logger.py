@@ -5,12 +5,24 @@ This is a module for filtering sensitive data from a message.
 
 import re
 import logging
-from typing import List
+import logging.handlers
+import argparse
+import queue
+import resource
+import sys
+import threading
+import time
+from functools import lru_cache
+from re import Match, Pattern
+from typing import Callable, List, Sequence, TextIO, Tuple
 import os
 import mysql.connector
 
 
 PII_FIELDS = ('name', 'email', 'phone', 'ssn', 'password')
+LOGGER_HANDLER_NAME = 'user_data'
+USER_COLUMNS = ('name', 'email', 'phone', 'ssn', 'password', 'ip',
+                'last_login', 'user_agent')
 
 
 class RedactingFormatter(logging.Formatter):
@@ -23,27 +35,160 @@ class RedactingFormatter(logging.Formatter):
     def __init__(self, fields: List[str]):
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self._pattern, self._markers = _compile_redaction(
+            tuple(fields), self.SEPARATOR)
+        self._replacement = _redaction_function(self.REDACTION)
 
     def format(self, record: logging.LogRecord) -> str:
         """Formats the log record and applies redaction to sensitive data."""
         formatted_message = super(RedactingFormatter, self).format(record)
-        return filter_datum(self.fields, self.REDACTION,
-                            formatted_message, self.SEPARATOR)
+        return _redact(self._pattern, self._markers, self._replacement,
+                       formatted_message)
+
+
+@lru_cache(maxsize=128)
+def _compile_redaction(
+        fields: Tuple[str, ...], separator: str
+        ) -> Tuple[Pattern, Tuple[str, ...]]:
+    """
+    Compiles the redaction pattern of a set of fields.
+
+    Returns:
+        tuple: The compiled pattern, and the `field=` markers whose absence
+        from a message means there is nothing to redact (None if a field
+        is itself a regex, so no such shortcut is possible).
+    """
+
+    pattrn = (r'((?:' + '|'.join(fields) + r')=)[^'
+              + re.escape(separator) + r']+')
+    markers = tuple(f'{field}=' for field in fields)
+    if any(re.escape(field) != field for field in fields):
+        markers = None
+    return re.compile(pattrn), markers
+
+
+@lru_cache(maxsize=128)
+def _redaction_function(redaction: str) -> Callable[[Match], str]:
+    """ Builds the substitution function replacing a value by redaction. """
+    def replace(match: Match) -> str:
+        return match[1] + redaction
+    return replace
+
+
+def _redact(
+        pattern: Pattern, markers: Tuple[str, ...],
+        replacement: Callable[[Match], str], message: str
+        ) -> str:
+    """ Redacts a message, skipping the regex if no field occurs in it. """
+    if markers is not None and not any(m in message for m in markers):
+        return message
+    return pattern.sub(replacement, message)
 
 
 def filter_datum(
         fields: List[str], redaction: str, message: str, separator: str
         ) -> str:
     """ Filter sensitive data from a message. """
-    pattrn = r'(' + '|'.join(fields) + r')=([^' + re.escape(separator) + r']+)'
-    return re.sub(
-            pattrn, lambda match: f'{match.group(1)}={redaction}', message)
+    pattern, markers = _compile_redaction(tuple(fields), separator)
+    return _redact(pattern, markers, _redaction_function(redaction), message)
+
+
+class AsyncBatchingHandler(logging.Handler):
+    """
+    Handler queueing records in a bounded in-memory queue, formatted and
+    written in batches by a background writer thread.
 
+    When the queue is full, emit() either waits for room (overflow='block')
+    or drops the record and counts it in `dropped` (overflow='drop').
+    """
+
+    _SENTINEL = None
+
+    def __init__(
+            self, stream: TextIO = None, queue_size: int = 10000,
+            overflow: str = 'block', batch_size: int = 100
+            ):
+        if overflow not in ('block', 'drop'):
+            raise ValueError(f'Unknown overflow policy: {overflow}')
+        super(AsyncBatchingHandler, self).__init__()
+        self.stream = stream if stream is not None else sys.stderr
+        self.queue = queue.Queue(queue_size)
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._write_loop, name='user_data-log-writer',
+            daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """ Queues a record, merging its arguments into the message. """
+        record.msg = record.getMessage()
+        record.args = None
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """ Waits until every queued record has been written. """
+        if self._thread.is_alive():
+            self.queue.join()
+
+    def close(self) -> None:
+        """ Writes the queued records and stops the writer thread. """
+        if self._thread.is_alive():
+            self.queue.put(self._SENTINEL)
+            self._thread.join()
+        super(AsyncBatchingHandler, self).close()
+
+    def _write_loop(self) -> None:
+        """ Formats and writes batches of records until the sentinel. """
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            for record in batch:
+                if record is self._SENTINEL:
+                    continue
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+            try:
+                if lines:
+                    self.stream.write('\n'.join(lines) + '\n')
+                    self.stream.flush()
+            except Exception:
+                self.handleError(batch[0])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if self._SENTINEL in batch:
+                return
 
-def get_logger() -> logging.Logger:
+
+def get_logger(
+        asynchronous: bool = False, queue_size: int = 10000,
+        overflow: str = 'block', batch_size: int = 100
+        ) -> logging.Logger:
     """
     Returns a logger object configured to log user data.
 
+    By default records are redacted and written to stderr by the caller.
+    With asynchronous=True they go through an AsyncBatchingHandler
+    instead (see its queue_size, overflow and batch_size). Calling it
+    again doesn't stack handlers: the existing one is kept if it is of
+    the requested kind, replaced otherwise.
+
     Returns:
         logging.Logger: The logger object.
     """
@@ -52,14 +197,42 @@ def get_logger() -> logging.Logger:
     logger.setLevel(logging.INFO)
     logger.propagate = False
 
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
+    installed = [handler for handler in logger.handlers
+                 if handler.get_name() == LOGGER_HANDLER_NAME]
+    if installed and all(
+            isinstance(handler, AsyncBatchingHandler) == asynchronous
+            for handler in installed):
+        return logger
+    for handler in installed:
+        logger.removeHandler(handler)
+        handler.close()
 
-    logger.addHandler(stream_handler)
+    if asynchronous:
+        handler = AsyncBatchingHandler(queue_size=queue_size,
+                                       overflow=overflow,
+                                       batch_size=batch_size)
+    else:
+        handler = logging.StreamHandler()
+    handler.set_name(LOGGER_HANDLER_NAME)
+    handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
+
+    logger.addHandler(handler)
 
     return logger
 
 
+def shutdown_logger() -> None:
+    """
+    Flushes and closes the handlers installed by get_logger.
+    """
+
+    logger = logging.getLogger('user_data')
+    for handler in list(logger.handlers):
+        if handler.get_name() == LOGGER_HANDLER_NAME:
+            logger.removeHandler(handler)
+            handler.close()
+
+
 def get_db() -> mysql.connector.connection.MySQLConnection:
     """
     Get a connection to the MySQL database.
@@ -84,6 +257,15 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     return connection
 
 
+def format_row(columns: Sequence[str], row: tuple) -> str:
+    """
+    Formats a row of the users table as a `column=value;` message.
+    """
+
+    return ' '.join(f'{column}={value};'
+                    for column, value in zip(columns, row))
+
+
 def main():
     """
     Main function that retrieves user data from the database and logs it.
@@ -96,16 +278,97 @@ def main():
     logger = get_logger()
 
     for row in cursor:
-        message = (
-            f'name={row[0]}; email={row[1]}; phone={row[2]}; ssn={row[3]}; '
-            f'password={row[4]}; ip={row[5]}; last_login={row[6]}; '
-            f'user_agent={row[7]};'
-        )
-        logger.info(message)
+        logger.info(format_row(USER_COLUMNS, row))
 
     cursor.close()
     db.close()
 
 
+class _BlockingQueueHandler(logging.handlers.QueueHandler):
+    """ QueueHandler waiting for room in a bounded queue. """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """ Puts a record in the queue, blocking while it is full. """
+        self.queue.put(record)
+
+
+class _BlockingQueueListener(logging.handlers.QueueListener):
+    """ QueueListener whose stop() waits for room in a bounded queue. """
+
+    def enqueue_sentinel(self) -> None:
+        """ Puts the stop sentinel in the queue, blocking while full. """
+        self.queue.put(self._sentinel)
+
+
+def export_users(
+        columns: Sequence[str] = USER_COLUMNS, batch_size: int = 1000,
+        queue_size: int = 10000
+        ) -> None:
+    """
+    Streams the users table to the log.
+
+    Rows are read in batches of batch_size through an unbuffered cursor,
+    and only the requested columns are fetched. Records go through a
+    bounded queue to a listener thread, which does the redaction and the
+    writes so they don't block the fetch loop. Rows/sec and peak RSS are
+    reported on stderr at the end.
+    """
+
+    unknown = set(columns) - set(USER_COLUMNS)
+    if not columns or unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
+    log_queue = queue.Queue(queue_size)
+    listener = _BlockingQueueListener(log_queue, stream_handler)
+
+    logger = logging.getLogger('user_data.export')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    queue_handler = _BlockingQueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+
+    db = get_db()
+    cursor = db.cursor(buffered=False)
+    rows = 0
+    start = time.perf_counter()
+    listener.start()
+    try:
+        cursor.execute(f"SELECT {', '.join(columns)} FROM users;")
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                logger.info(format_row(columns, row))
+            rows += len(batch)
+    finally:
+        try:
+            listener.stop()
+            logger.removeHandler(queue_handler)
+        finally:
+            try:
+                cursor.close()
+            finally:
+                db.close()
+
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'{rows} rows in {elapsed:.2f}s '
+          f'({rows / elapsed if elapsed else 0:.0f} rows/sec), '
+          f'peak RSS {peak_rss / 1024:.1f} MiB', file=sys.stderr)
+
+
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Log the users table.')
+    parser.add_argument('--stream', action='store_true',
+                        help='batched streaming export (see export_users)')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--columns', default=','.join(USER_COLUMNS),
+                        help='comma-separated columns to export')
+    args = parser.parse_args()
+    if args.stream:
+        export_users(args.columns.split(','), args.batch_size)
+    else:
+        main()
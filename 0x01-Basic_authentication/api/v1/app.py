@@ -3,6 +3,8 @@
 Route module for the API
 """
 from os import getenv
+from api.v1.auth.path_matcher import PathMatcher
+from api.v1.metrics import METRICS_PUBLIC, instrument
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
@@ -22,6 +24,17 @@ elif auth_type == "basic_auth":
     from api.v1.auth.basic_auth import BasicAuth
     auth = BasicAuth()
 
+instrument(app, auth)
+
+EXCLUDED_PATHS = PathMatcher.from_env([
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/'
+])
+
+if METRICS_PUBLIC:
+    EXCLUDED_PATHS.add('/api/v1/metrics/')
+
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -53,12 +66,7 @@ def filter_requests():
     if auth is None:
         return
 
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/'
-        ]
-    if not auth.require_auth(request.path, excluded_paths):
+    if not auth.require_auth(request.path, EXCLUDED_PATHS, request.method):
         return
 
     if auth.authorization_header(request) is None:
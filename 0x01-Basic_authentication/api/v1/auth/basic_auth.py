@@ -3,6 +3,7 @@
 This module contains the BasicAuth class for basic authentication.
 """
 from api.v1.auth.auth import Auth
+from api.v1.auth.credential_cache import credential_cache_from_env
 import base64
 import binascii
 from typing import TypeVar
@@ -15,6 +16,8 @@ class BasicAuth(Auth):
     It inherits from the Auth class.
     """
 
+    credential_cache = credential_cache_from_env()
+
     def extract_base64_authorization_header(
               self, authorization_header: str) -> str:
         """
@@ -104,6 +107,10 @@ class BasicAuth(Auth):
         if auth_header is None:
             return None
 
+        user = self.credential_cache.get(auth_header)
+        if user is not None:
+            return user
+
         encoded_auth_header = self.extract_base64_authorization_header(
             auth_header)
         if encoded_auth_header is None:
@@ -120,4 +127,7 @@ class BasicAuth(Auth):
         if user_email is None or user_pwd is None:
             return None
 
-        return self.user_object_from_credentials(user_email, user_pwd)
+        user = self.user_object_from_credentials(user_email, user_pwd)
+        if user is not None:
+            self.credential_cache.put(auth_header, user)
+        return user
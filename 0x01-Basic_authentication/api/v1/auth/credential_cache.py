@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+This module contains the CredentialCache class which remembers
+verified Basic authorization headers.
+"""
+from collections import OrderedDict
+import hashlib
+import hmac
+import os
+import threading
+import time
+from typing import TypeVar
+from models.user import User
+
+
+class CredentialCache:
+    """
+    Bounded LRU cache, with a TTL, of the user ID resolved for an
+    Authorization header.
+
+    Headers are stored as a keyed hash (HMAC with a per-process key),
+    never in clear. An entry is only served while its user still exists
+    and still has the password hash it was verified against.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: int = 300):
+        """
+        Initializes a new instance of the CredentialCache class.
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, authorization_header: str) -> bytes:
+        """
+        Computes the keyed hash of an authorization header.
+        """
+
+        return hmac.new(self._key, authorization_header.encode(),
+                        hashlib.sha256).digest()
+
+    def get(self, authorization_header: str) -> TypeVar('User'):
+        """
+        Retrieves the user cached for an authorization header,
+        None if there is no valid entry.
+        """
+
+        if self.max_size <= 0:
+            return None
+
+        digest = self._digest(authorization_header)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            user_id, password, expires_at = entry
+            user = User.get(user_id)
+            if (
+                expires_at < time.monotonic()
+                or user is None
+                or user.password != password
+            ):
+                del self._entries[digest]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return user
+
+    def put(self, authorization_header: str, user: TypeVar('User')):
+        """
+        Caches the user verified for an authorization header.
+        """
+
+        if self.max_size <= 0:
+            return
+
+        digest = self._digest(authorization_header)
+        with self._lock:
+            self._entries[digest] = (
+                user.id, user.password, time.monotonic() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the size and the hit/miss/eviction counters of the cache.
+        """
+
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def credential_cache_from_env() -> CredentialCache:
+    """
+    Creates the credential cache configured by BASIC_AUTH_CACHE_SIZE
+    (0 disables it) and BASIC_AUTH_CACHE_TTL (in seconds).
+    """
+
+    try:
+        max_size = int(os.getenv('BASIC_AUTH_CACHE_SIZE', '1024'))
+    except ValueError:
+        max_size = 1024
+    try:
+        ttl = int(os.getenv('BASIC_AUTH_CACHE_TTL', '300'))
+    except ValueError:
+        ttl = 300
+    return CredentialCache(max_size, ttl)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+""" Request metrics module
+
+Opt-in with API_METRICS=1: the hot-path methods of the auth object,
+the models and the storage engine are wrapped to time each phase of a
+request (auth header parsing, session and user lookup, password
+verification, storage reads/writes, view, JSON serialization), and the
+per-request totals are aggregated into histograms served in Prometheus
+text format by GET /api/v1/metrics, which requires authentication
+like any other endpoint unless API_METRICS_PUBLIC=1.
+
+When disabled, nothing is wrapped and requests don't pay for it.
+"""
+from os import getenv
+import functools
+import inspect
+import threading
+import time
+from flask import Flask, g, has_request_context, request
+
+
+METRICS_ENABLED = getenv("API_METRICS", "0").lower() in ("1", "true", "yes")
+METRICS_PUBLIC = getenv("API_METRICS_PUBLIC", "0").lower() in (
+    "1", "true", "yes")
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+AUTH_PHASES = {
+    'authorization_header': 'auth_header',
+    'session_cookie': 'auth_header',
+    'extract_base64_authorization_header': 'auth_header',
+    'decode_base64_authorization_header': 'auth_header',
+    'extract_user_credentials': 'auth_header',
+    'user_id_for_session_id': 'session_lookup',
+}
+MODEL_PHASES = {
+    'search': 'user_lookup',
+    'get': 'user_lookup',
+    'is_valid_password': 'password_verify',
+}
+STORAGE_PHASES = {
+    'load': 'storage_read',
+    'changes': 'storage_read',
+    'upsert': 'storage_write',
+    'upsert_many': 'storage_write',
+    'delete': 'storage_write',
+}
+
+
+class Histogram():
+    """ Cumulative histogram of durations (in seconds) by label values
+    """
+
+    def __init__(self, name: str, description: str, labels: tuple,
+                 buckets: tuple = BUCKETS):
+        """ Initialize a Histogram
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: tuple, value: float):
+        """ Record one duration
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = \
+                    [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        """ Return the lines of the histogram in Prometheus text format
+        """
+        lines = ["# HELP {} {}".format(self.name, self.description),
+                 "# TYPE {} histogram".format(self.name)]
+        with self._lock:
+            series = sorted((k, [list(v[0]), v[1], v[2]])
+                            for k, v in self._series.items())
+        for label_values, (counts, total, count) in series:
+            labels = ",".join('{}="{}"'.format(name, _escape(value))
+                              for name, value in zip(self.labels,
+                                                     label_values))
+            prefix = labels + "," if labels else ""
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append('{}_bucket{{{}le="{}"}} {}'.format(
+                    self.name, prefix, bound, bucket_count))
+            lines.append('{}_bucket{{{}le="+Inf"}} {}'.format(
+                self.name, prefix, count))
+            lines.append("{}_sum{{{}}} {}".format(self.name, labels, total))
+            lines.append("{}_count{{{}}} {}".format(self.name, labels,
+                                                     count))
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds", "Duration of the API requests",
+    ("method", "route", "status"))
+PHASE_DURATION = Histogram(
+    "api_request_phase_duration_seconds",
+    "Time spent in each phase of an API request (phases may nest)",
+    ("phase",))
+
+
+def _escape(value) -> str:
+    """ Escape a Prometheus label value
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"') \
+        .replace("\n", "\\n")
+
+
+def _timed(phase: str, func):
+    """ Wrap func to add its duration to the phase of the current request
+    (calls nested in the same phase are counted once)
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not has_request_context():
+            return func(*args, **kwargs)
+        active = g.setdefault('_metrics_active', set())
+        if phase in active:
+            return func(*args, **kwargs)
+        active.add(phase)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            active.discard(phase)
+            phases = g.setdefault('_metrics_phases', {})
+            phases[phase] = phases.get(phase, 0.0) + elapsed
+    return wrapper
+
+
+def _wrap(owner, name: str, phase: str):
+    """ Replace the method `name` of a class or an object by a timed one
+    """
+    if not isinstance(owner, type):
+        setattr(owner, name, _timed(phase, getattr(owner, name)))
+        return
+    original = inspect.getattr_static(owner, name)
+    if isinstance(original, classmethod):
+        setattr(owner, name, classmethod(_timed(phase, original.__func__)))
+    elif isinstance(original, staticmethod):
+        setattr(owner, name, staticmethod(_timed(phase,
+                                                 original.__func__)))
+    else:
+        setattr(owner, name, _timed(phase, original))
+
+
+def instrument(app: Flask, auth=None):
+    """ Time the phases of each request of app, if metrics are enabled
+    (call it before registering the other before_request functions)
+    """
+    if not METRICS_ENABLED:
+        return
+    from models.base import STORAGE
+    from models.user import User
+
+    if auth is not None:
+        for cls in type(auth).__mro__:
+            for name, phase in AUTH_PHASES.items():
+                if name in cls.__dict__:
+                    _wrap(cls, name, phase)
+    for name, phase in MODEL_PHASES.items():
+        _wrap(User, name, phase)
+    try:
+        from models.user_session import UserSession
+        _wrap(UserSession, 'search', 'session_lookup')
+    except ImportError:
+        pass
+    for name, phase in STORAGE_PHASES.items():
+        _wrap(STORAGE, name, phase)
+    for endpoint, view in list(app.view_functions.items()):
+        app.view_functions[endpoint] = _timed('view', view)
+    if hasattr(app, 'json') and hasattr(app.json, 'dumps'):
+        _wrap(app.json, 'dumps', 'json_serialization')
+
+    @app.before_request
+    def start_timer():
+        """ Record the start of the request
+        """
+        g._metrics_start = time.perf_counter()
+
+    @app.teardown_request
+    def record_request(exception=None):
+        """ Aggregate the timings of the request
+        """
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        for phase, duration in g.pop('_metrics_phases', {}).items():
+            PHASE_DURATION.observe((phase,), duration)
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        status = getattr(g, '_metrics_status', 500 if exception else 200)
+        REQUEST_DURATION.observe((request.method, route, status), elapsed)
+
+    @app.after_request
+    def record_status(response):
+        """ Keep the status code of the response
+        """
+        g._metrics_status = response.status_code
+        return response
+
+
+def render() -> str:
+    """ Return all metrics in Prometheus text format
+    """
+    lines = REQUEST_DURATION.render() + PHASE_DURATION.render()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+""" Password hashers module
+
+Hashes are self-describing strings `<algorithm>$<data>`, so the hasher
+of a stored hash is found from its prefix and outdated hashes can be
+upgraded on the next successful login. Hashes without prefix are the
+legacy unsalted SHA256 hex digests.
+"""
+from os import getenv
+import hashlib
+import hmac
+import math
+import os
+import threading
+import time
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+
+HASHERS = {}
+_default_hasher = None
+_default_lock = threading.Lock()
+
+
+class SHA256Hasher():
+    """ Unsalted SHA256 (legacy)
+    """
+
+    algorithm = "sha256"
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        digest = hashlib.sha256(pwd.encode()).hexdigest().lower()
+        return "{}${}".format(self.algorithm, digest)
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against a hash
+        """
+        return hmac.compare_digest(self.encode(pwd), encoded)
+
+    def needs_update(self, encoded: str) -> bool:
+        """ Check if a hash was made with weaker parameters
+        """
+        return False
+
+    def calibrate(self, target_ms: float):
+        """ Nothing to tune
+        """
+
+
+class PBKDF2Hasher():
+    """ Salted PBKDF2-HMAC-SHA256 with a tunable number of iterations
+    """
+
+    algorithm = "pbkdf2_sha256"
+    min_iterations = 10000
+
+    def __init__(self, iterations: int = 600000):
+        """ Initialize a PBKDF2Hasher
+        """
+        self.iterations = iterations
+
+    def _derive(self, pwd: str, salt: str, iterations: int) -> str:
+        """ Derive the hex key of a password
+        """
+        return hashlib.pbkdf2_hmac("sha256", pwd.encode(), salt.encode(),
+                                   iterations).hex()
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        salt = os.urandom(16).hex()
+        return "{}${}${}${}".format(self.algorithm, self.iterations, salt,
+                                    self._derive(pwd, salt, self.iterations))
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against a hash
+        """
+        try:
+            _, iterations, salt, key = encoded.split("$")
+            iterations = int(iterations)
+        except ValueError:
+            return False
+        return hmac.compare_digest(self._derive(pwd, salt, iterations), key)
+
+    def needs_update(self, encoded: str) -> bool:
+        """ Check if a hash was made with clearly fewer iterations
+        (calibration noise between restarts doesn't trigger a rehash)
+        """
+        try:
+            return int(encoded.split("$")[1]) < self.iterations * 3 // 4
+        except (IndexError, ValueError):
+            return True
+
+    def calibrate(self, target_ms: float):
+        """ Pick the number of iterations taking about target_ms here
+        """
+        sample = self.min_iterations
+        start = time.perf_counter()
+        self._derive("calibration", "calibration", sample)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.iterations = max(self.min_iterations,
+                              int(sample * target_ms / max(elapsed_ms, 1e-3)))
+
+
+class BcryptHasher():
+    """ bcrypt with a tunable work factor (needs the bcrypt package)
+    """
+
+    algorithm = "bcrypt"
+
+    def __init__(self, rounds: int = 12):
+        """ Initialize a BcryptHasher
+        """
+        self.rounds = rounds
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        hashed = bcrypt.hashpw(pwd.encode(), bcrypt.gensalt(self.rounds))
+        return "{}${}".format(self.algorithm, hashed.decode())
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against a hash
+        """
+        try:
+            return bcrypt.checkpw(pwd.encode(),
+                                  encoded.split("$", 1)[1].encode())
+        except (IndexError, ValueError):
+            return False
+
+    def needs_update(self, encoded: str) -> bool:
+        """ Check if a hash was made with a lower work factor
+        """
+        try:
+            return int(encoded.split("$")[3]) < self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def calibrate(self, target_ms: float):
+        """ Pick the work factor taking about target_ms here
+        """
+        sample = 4
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(sample))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        extra = math.log2(target_ms / max(elapsed_ms, 1e-3))
+        self.rounds = min(31, max(sample, sample + round(extra)))
+
+
+def register_hasher(hasher):
+    """ Register a hasher under its algorithm name
+    """
+    HASHERS[hasher.algorithm] = hasher
+
+
+register_hasher(SHA256Hasher())
+register_hasher(PBKDF2Hasher())
+if bcrypt is not None:
+    register_hasher(BcryptHasher())
+
+
+def identify(encoded: str) -> str:
+    """ Return the algorithm of a hash
+    """
+    if "$" not in encoded:
+        return SHA256Hasher.algorithm
+    return encoded.split("$", 1)[0]
+
+
+def default_hasher():
+    """ Return the hasher of new passwords, selected by PASSWORD_HASHER
+    (default `pbkdf2_sha256`) and calibrated on first use to take about
+    PASSWORD_HASH_TARGET_MS (default 50) on this host, unless
+    PASSWORD_HASH_COST sets its iterations/work factor
+    """
+    global _default_hasher
+
+    with _default_lock:
+        if _default_hasher is None:
+            hasher = HASHERS[getenv("PASSWORD_HASHER",
+                                    PBKDF2Hasher.algorithm)]
+            cost = getenv("PASSWORD_HASH_COST")
+            if cost and isinstance(hasher, PBKDF2Hasher):
+                hasher.iterations = int(cost)
+            elif cost and isinstance(hasher, BcryptHasher):
+                hasher.rounds = int(cost)
+            elif not cost:
+                hasher.calibrate(float(getenv("PASSWORD_HASH_TARGET_MS",
+                                              "50")))
+            _default_hasher = hasher
+        return _default_hasher
+
+
+def make_password(pwd: str) -> str:
+    """ Hash a password with the default hasher
+    """
+    return default_hasher().encode(pwd)
+
+
+def check_password(pwd: str, encoded: str) -> bool:
+    """ Check a password against a hash of any registered algorithm
+    """
+    algorithm = identify(encoded)
+    hasher = HASHERS.get(algorithm)
+    if hasher is None:
+        return False
+    if "$" not in encoded:
+        encoded = "{}${}".format(algorithm, encoded.lower())
+    return hasher.verify(pwd, encoded)
+
+
+def needs_rehash(encoded: str) -> bool:
+    """ Check if a hash should be upgraded to the default hasher
+    """
+    hasher = default_hasher()
+    if identify(encoded) != hasher.algorithm or "$" not in encoded:
+        return True
+    return hasher.needs_update(encoded)
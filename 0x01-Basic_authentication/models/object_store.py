@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+""" Object store module
+
+Building blocks of the in-memory `DATA` store of `models.base`, safe
+under a threaded server:
+  - `RWLock`: one per class, held shared by readers (`search`) and
+    exclusively by writers (`save`, `remove`, `load_from_file`...)
+  - `ObjectTable`: the objects of a class by ID, with a cached
+    copy-on-write snapshot to iterate without holding a lock
+"""
+import threading
+
+
+class _ReadGuard():
+    """ Context manager holding a RWLock shared
+    """
+
+    __slots__ = ('lock',)
+
+    def __init__(self, lock: 'RWLock'):
+        """ Initialize a _ReadGuard
+        """
+        self.lock = lock
+
+    def __enter__(self):
+        """ Acquire the lock shared
+        """
+        lock = self.lock
+        with lock._mutex:
+            # fast path of acquire_read, without the method call
+            if lock._writer is None and not lock._writers_waiting:
+                lock._readers += 1
+                return self
+        lock.acquire_read()
+        return self
+
+    def __exit__(self, *exc_info):
+        """ Release the lock
+        """
+        self.lock.release_read()
+
+
+class _WriteGuard(_ReadGuard):
+    """ Context manager holding a RWLock exclusively
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """ Acquire the lock exclusively
+        """
+        self.lock.acquire_write()
+        return self
+
+    def __exit__(self, *exc_info):
+        """ Release the lock
+        """
+        self.lock.release_write()
+
+
+class RWLock():
+    """ Reader-writer lock: any number of readers, or one writer
+
+    Waiting writers block new readers, so writers can't be starved.
+    The writer may acquire the lock again (to read or write) while it
+    holds it; readers must not. Uncontended reads only take the
+    internal mutex once to acquire and once to release.
+    """
+
+    def __init__(self):
+        """ Initialize a RWLock
+        """
+        self._mutex = threading.Lock()
+        self._cond = threading.Condition(self._mutex)
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._writers_waiting = 0
+        self._read = _ReadGuard(self)
+        self._write = _WriteGuard(self)
+
+    def acquire_read(self):
+        """ Acquire the lock shared
+        """
+        with self._mutex:
+            if self._writer is None and not self._writers_waiting:
+                self._readers += 1
+                return
+            if self._writer == threading.get_ident():
+                self._depth += 1
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """ Release the lock acquired shared
+        """
+        with self._mutex:
+            if self._writer is not None:
+                # only the writer itself can read meanwhile
+                self._depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers and self._writers_waiting:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        """ Acquire the lock exclusively
+        """
+        me = threading.get_ident()
+        with self._mutex:
+            if self._writer == me:
+                self._depth += 1
+                return
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._depth = 1
+
+    def release_write(self):
+        """ Release the lock acquired exclusively
+        """
+        with self._mutex:
+            self._depth -= 1
+            if self._depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    def read(self) -> _ReadGuard:
+        """ Context manager holding the lock shared
+        """
+        return self._read
+
+    def write(self) -> _WriteGuard:
+        """ Context manager holding the lock exclusively
+        """
+        return self._write
+
+
+class ObjectTable(dict):
+    """ Objects of one class by ID
+
+    `snapshot()` returns an immutable tuple of the objects, built once
+    and shared until the next change: iterating it is safe while other
+    threads save or remove objects, and repeated scans don't copy.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """ Initialize an ObjectTable
+        """
+        super().__init__(*args, **kwargs)
+        self._snapshot = None
+
+    def __setitem__(self, obj_id, obj):
+        """ Add or replace an object
+        """
+        super().__setitem__(obj_id, obj)
+        self._snapshot = None
+
+    def __delitem__(self, obj_id):
+        """ Remove an object
+        """
+        super().__delitem__(obj_id)
+        self._snapshot = None
+
+    def pop(self, *args):
+        """ Remove an object and return it
+        """
+        self._snapshot = None
+        return super().pop(*args)
+
+    def popitem(self):
+        """ Remove the last added object and return it with its ID
+        """
+        self._snapshot = None
+        return super().popitem()
+
+    def setdefault(self, obj_id, obj=None):
+        """ Add an object if its ID is missing and return the object
+        """
+        self._snapshot = None
+        return super().setdefault(obj_id, obj)
+
+    def update(self, *args, **kwargs):
+        """ Add or replace several objects
+        """
+        super().update(*args, **kwargs)
+        self._snapshot = None
+
+    def clear(self):
+        """ Remove all objects
+        """
+        super().clear()
+        self._snapshot = None
+
+    def snapshot(self) -> tuple:
+        """ Return all objects as of now (hold the class lock shared,
+        so that no writer changes the table meanwhile)
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = tuple(self.values())
+        return snapshot
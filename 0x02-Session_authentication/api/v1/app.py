@@ -3,6 +3,9 @@
 Route module for the API
 """
 from os import getenv
+from api.v1.auth.context import current_user
+from api.v1.auth.path_matcher import PathMatcher
+from api.v1.metrics import METRICS_PUBLIC, instrument
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
@@ -30,6 +33,24 @@ elif auth_type == "session_exp_auth":
 elif auth_type == "session_db_auth":
     from api.v1.auth.session_db_auth import SessionDBAuth
     auth = SessionDBAuth()
+elif auth_type == "session_backend_auth":
+    from api.v1.auth.session_backend_auth import SessionBackendAuth
+    auth = SessionBackendAuth()
+elif auth_type == "signed_session_auth":
+    from api.v1.auth.signed_session_auth import SignedSessionAuth
+    auth = SignedSessionAuth()
+
+instrument(app, auth)
+
+EXCLUDED_PATHS = PathMatcher.from_env([
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+    '/api/v1/auth_session/login/'
+])
+
+if METRICS_PUBLIC:
+    EXCLUDED_PATHS.add('/api/v1/metrics/')
 
 
 @app.errorhandler(404)
@@ -62,13 +83,7 @@ def filter_requests():
     if auth is None:
         return
 
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/',
-        '/api/v1/auth_session/login/'
-        ]
-    if not auth.require_auth(request.path, excluded_paths):
+    if not auth.require_auth(request.path, EXCLUDED_PATHS, request.method):
         return
 
     if (
@@ -77,10 +92,11 @@ def filter_requests():
     ):
         abort(401)
 
-    if auth.current_user(request) is None:
+    user = current_user(auth)
+    if user is None:
         abort(403)
 
-    request.current_user = auth.current_user(request)
+    request.current_user = user
 
 
 if __name__ == "__main__":
@@ -3,18 +3,32 @@
 This module contains the Auth class which handles
 authentication and authorization.
 """
+from api.v1.auth.path_matcher import PathMatcher
+from functools import lru_cache
 from typing import List, TypeVar
 import os
 
 
+@lru_cache(maxsize=32)
+def _compile_excluded_paths(excluded_paths: tuple) -> PathMatcher:
+    """
+    Compiles a list of excluded paths into a PathMatcher.
+    """
+
+    return PathMatcher(excluded_paths)
+
+
 class Auth:
     """
     This class provides methods for authentication and authorization.
     """
 
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
+    def require_auth(self, path: str, excluded_paths: List[str],
+                     method: str = None) -> bool:
         """
-        Checks if authentication is required for a given path.
+        Checks if authentication is required for a given path (and method).
+        excluded_paths is a list of PathMatcher rules, compiled once and
+        cached, or an already compiled PathMatcher.
         """
 
         if (
@@ -24,17 +38,10 @@ class Auth:
         ):
             return True
 
-        if path[-1] != '/':
-            path = path + '/'
-
-        for excluded_path in excluded_paths:
-            if excluded_path[-1] == '*':
-                if path.startswith(excluded_path[:-1]):
-                    return False
-            elif path == excluded_path:
-                return False
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = _compile_excluded_paths(tuple(excluded_paths))
 
-        return True
+        return not excluded_paths.match(path, method)
 
     def authorization_header(self, request=None) -> str:
         """
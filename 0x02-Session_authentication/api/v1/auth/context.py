@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+This module contains the request-scoped authentication context:
+the user of a request is resolved at most once and kept on flask.g.
+"""
+from flask import g, request
+from typing import TypeVar
+
+
+_UNRESOLVED = object()
+
+
+def current_user(auth=None) -> TypeVar('User'):
+    """
+    Return the authenticated user of the current request (None if none),
+    calling auth.current_user (default: the app's auth) only the first
+    time in the request.
+    """
+
+    user = g.get('current_user', _UNRESOLVED)
+    if user is _UNRESOLVED:
+        if auth is None:
+            from api.v1.app import auth as app_auth
+            auth = app_auth
+        user = auth.current_user(request) if auth is not None else None
+        g.current_user = user
+    return user
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+This module contains the PathMatcher class, which compiles the paths
+excluded from authentication once so that each request is matched in
+a few dictionary lookups, however many rules there are.
+"""
+from typing import Iterable
+import os
+
+
+class PathMatcher:
+    """
+    This class matches request paths against exclusion rules.
+
+    A rule is `[METHODS ]PATH`: METHODS is an optional comma-separated
+    list of HTTP methods (default: any method), and PATH is either exact
+    (`/api/v1/status/`) or a prefix ending with `*` (`/api/v1/static/*`).
+    Paths are compared with a trailing slash, like require_auth does.
+    """
+
+    def __init__(self, rules: Iterable[str] = ()):
+        """
+        Initializes a new PathMatcher with the given rules.
+        """
+
+        self._exact = {}
+        self._prefixes = {}
+        self._prefix_lengths = ()
+        for rule in rules:
+            self.add(rule)
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        """
+        Appends the trailing slash a path is compared with.
+        """
+
+        return path if path.endswith('/') else path + '/'
+
+    @staticmethod
+    def _merge(rules: dict, path: str, methods: frozenset):
+        """
+        Adds methods to the rule of a path (None meaning any method).
+        """
+
+        if path in rules and (rules[path] is None or methods is None):
+            rules[path] = None
+        elif path in rules:
+            rules[path] = rules[path] | methods
+        else:
+            rules[path] = methods
+
+    def add(self, rule: str):
+        """
+        Adds one rule; blank rules and `#` comments are ignored.
+        """
+
+        rule = rule.strip()
+        if not rule or rule.startswith('#'):
+            return
+
+        methods = None
+        if ' ' in rule:
+            methods, rule = rule.split(None, 1)
+            methods = frozenset(method.strip().upper()
+                                for method in methods.split(',')
+                                if method.strip())
+            rule = rule.strip()
+
+        if rule.endswith('*'):
+            self._merge(self._prefixes, rule[:-1], methods)
+            self._prefix_lengths = tuple(sorted(
+                {len(prefix) for prefix in self._prefixes}))
+        else:
+            self._merge(self._exact, self._normalize(rule), methods)
+
+    def match(self, path: str, method: str = None) -> bool:
+        """
+        Checks if a request path (and method) is excluded.
+        Method-specific rules only match when the method is given.
+        """
+
+        if path is None:
+            return False
+
+        path = self._normalize(path)
+        method = method.upper() if method else None
+        if path in self._exact and \
+                self._allows(self._exact[path], method):
+            return True
+
+        for length in self._prefix_lengths:
+            if length > len(path):
+                break
+            methods = self._prefixes.get(path[:length], False)
+            if methods is not False and self._allows(methods, method):
+                return True
+        return False
+
+    @staticmethod
+    def _allows(methods: frozenset, method: str) -> bool:
+        """
+        Checks if a rule's methods allow the request method.
+        """
+
+        return methods is None or (method is not None and method in methods)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of compiled rules.
+        """
+
+        return len(self._exact) + len(self._prefixes)
+
+    @classmethod
+    def from_env(cls, defaults: Iterable[str] = ()) -> 'PathMatcher':
+        """
+        Builds a PathMatcher from the default rules, plus the rules of
+        AUTH_EXCLUDED_PATHS (`;` or newline separated) and of the file
+        AUTH_EXCLUDED_PATHS_FILE (one rule per line).
+        """
+
+        matcher = cls(defaults)
+        for rule in os.getenv('AUTH_EXCLUDED_PATHS', '').replace(
+                '\n', ';').split(';'):
+            matcher.add(rule)
+
+        file_path = os.getenv('AUTH_EXCLUDED_PATHS_FILE')
+        if file_path:
+            with open(file_path, 'r') as f:
+                for rule in f:
+                    matcher.add(rule)
+        return matcher
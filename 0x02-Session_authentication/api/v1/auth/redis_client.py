@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+This module contains RedisClient, a minimal client of the Redis
+protocol (RESP2) with a connection pool and pipelining, enough for
+storing sessions without depending on a Redis package.
+"""
+from queue import Empty, Full, LifoQueue
+from urllib.parse import urlparse
+import socket
+
+
+class RedisError(Exception):
+    """
+    Raised for error replies of the server and protocol errors.
+    """
+
+
+class RedisClient:
+    """
+    This class sends commands to a Redis-protocol server.
+
+    Connections are kept in a pool of up to pool_size idle sockets and
+    reused by threads in turn. pipeline() sends several commands at once
+    and then reads all their replies, in a single round trip.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379,
+                 db: int = 0, password: str = None, timeout: float = 5,
+                 pool_size: int = 16):
+        """
+        Initializes a new instance of the RedisClient class.
+        """
+
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._pool = LifoQueue(pool_size)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisClient':
+        """
+        Creates a client from a `redis://[:password@]host[:port][/db]` URL.
+        """
+
+        parsed = urlparse(url)
+        db = parsed.path.strip('/')
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379,
+                   int(db) if db else 0, parsed.password, **kwargs)
+
+    @staticmethod
+    def _encode(args: tuple) -> bytes:
+        """
+        Encodes a command as a RESP array of bulk strings.
+        """
+
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    @classmethod
+    def _read_reply(cls, stream):
+        """
+        Reads one reply; error replies are returned as RedisError.
+        """
+
+        line = stream.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("Connection closed by the server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            return RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = stream.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by the server")
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [cls._read_reply(stream) for _ in range(length)]
+        raise RedisError("Unexpected reply {!r}".format(line))
+
+    def _connect(self):
+        """
+        Opens a new connection, authenticated and on the right database.
+        """
+
+        sock = socket.create_connection((self.host, self.port),
+                                        self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile('rb'))
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self._send(connection, setup)
+        return connection
+
+    def _send(self, connection, commands: list) -> list:
+        """
+        Sends commands on a connection and reads their replies,
+        raising the first error reply.
+        """
+
+        sock, stream = connection
+        sock.sendall(b''.join(self._encode(args) for args in commands))
+        replies = [self._read_reply(stream) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def pipeline(self, commands: list) -> list:
+        """
+        Sends a list of commands (tuples of arguments) in one round trip
+        and returns their replies.
+        """
+
+        if not commands:
+            return []
+        try:
+            connection = self._pool.get_nowait()
+        except Empty:
+            connection = self._connect()
+
+        try:
+            replies = self._send(connection, commands)
+        except RedisError:
+            self._release(connection)
+            raise
+        except BaseException:
+            self._close(connection)
+            raise
+        self._release(connection)
+        return replies
+
+    def execute(self, *args):
+        """
+        Sends one command and returns its reply.
+        """
+
+        return self.pipeline([args])[0]
+
+    def _release(self, connection):
+        """
+        Returns a connection to the pool, closing it if the pool is full.
+        """
+
+        try:
+            self._pool.put_nowait(connection)
+        except Full:
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection):
+        """
+        Closes a connection.
+        """
+
+        sock, stream = connection
+        stream.close()
+        sock.close()
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+
+        while True:
+            try:
+                self._close(self._pool.get_nowait())
+            except Empty:
+                return
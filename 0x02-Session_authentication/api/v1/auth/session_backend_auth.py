@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+This module contains the SessionBackendAuth class,
+which keeps sessions in a pluggable backend so that they can be
+shared by several workers or hosts.
+"""
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_backends import SessionBackend
+from api.v1.auth.session_backends import session_backend_from_env
+from api.v1.auth.session_exp_auth import _seconds_from_env
+from api.v1.auth.session_store import ExpiringSessionStore
+from uuid import uuid4
+import time
+
+
+class SessionBackendAuth(SessionAuth):
+    """
+    This class provides session-based authentication with the sessions
+    stored in the backend selected by SESSION_BACKEND.
+
+    Sessions expire SESSION_DURATION seconds after their creation and,
+    with SESSION_IDLE_TIMEOUT, after that many idle seconds: the backend
+    expiry is pushed back at most once every SESSION_TOUCH_INTERVAL
+    seconds per session and worker.
+    """
+
+    def __init__(self, backend: SessionBackend = None):
+        """
+        Initializes a new instance of the SessionBackendAuth class.
+        """
+
+        self.session_duration = _seconds_from_env('SESSION_DURATION')
+        self.idle_timeout = _seconds_from_env('SESSION_IDLE_TIMEOUT')
+        self.touch_interval = _seconds_from_env('SESSION_TOUCH_INTERVAL', 60)
+        if self.idle_timeout > 0:
+            self.touch_interval = min(self.touch_interval,
+                                      self.idle_timeout / 2)
+        self.backend = backend if backend is not None \
+            else session_backend_from_env()
+        # sessions whose expiry was pushed back recently by this worker
+        self._touched = ExpiringSessionStore(self.touch_interval)
+
+    def _ttl(self) -> float:
+        """
+        Computes the time to live of a new session (None: no expiry).
+        """
+
+        limits = [limit for limit in (self.session_duration,
+                                      self.idle_timeout) if limit > 0]
+        return min(limits) if limits else None
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        Creates a new session for the given user ID in the backend.
+        """
+
+        if user_id is None or not isinstance(user_id, str):
+            return None
+
+        session_id = str(uuid4())
+        self.backend.create(session_id, user_id, time.time(), self._ttl())
+        return session_id
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """
+        Retrieves the user ID associated with a given session ID.
+        """
+
+        if session_id is None or not isinstance(session_id, str):
+            return None
+
+        touch_ttl = None
+        if self.idle_timeout > 0 and session_id not in self._touched:
+            touch_ttl = self.idle_timeout
+        session = self.backend.get(session_id, touch_ttl)
+        if session is None:
+            return None
+
+        if (
+            self.session_duration > 0
+            and session['created_at'] + self.session_duration < time.time()
+        ):
+            self.backend.delete(session_id)
+            return None
+
+        if touch_ttl is not None and self.touch_interval > 0:
+            self._touched[session_id] = True
+        return session['user_id']
+
+    def destroy_session(self, request=None):
+        """
+        Destroys a session.
+        """
+
+        if request is None:
+            return False
+
+        session_id = self.session_cookie(request)
+        if not session_id:
+            return False
+
+        self._touched.pop(session_id)
+        return self.backend.delete(session_id)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+This module contains the session backends of SessionBackendAuth:
+in-memory, file (UserSession model), SQLite and Redis protocol.
+
+A session is stored as {'user_id', 'created_at'} (created_at being a
+UNIX timestamp, comparable across hosts) with an optional time to live
+that the backend enforces itself.
+"""
+from api.v1.auth.redis_client import RedisClient
+from api.v1.auth.session_store import ExpiringSessionStore
+from api.v1.auth.session_store import session_store_from_env
+from datetime import datetime
+from models.base import TIMESTAMP_FORMAT
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SessionBackend:
+    """
+    Interface of the session backends.
+    """
+
+    name = None
+
+    def create(self, session_id: str, user_id: str, created_at: float,
+               ttl: float = None):
+        """
+        Stores a new session, expiring after ttl seconds (None: never).
+        """
+
+        raise NotImplementedError()
+
+    def get(self, session_id: str, touch_ttl: float = None) -> dict:
+        """
+        Retrieves a live session, None if there is none; with touch_ttl,
+        also makes it expire touch_ttl seconds from now.
+        """
+
+        raise NotImplementedError()
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Removes a session, returning whether it existed.
+        """
+
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Releases the resources of the backend.
+        """
+
+
+class MemoryBackend(SessionBackend):
+    """
+    Sessions in an ExpiringSessionStore of the process
+    (not shared between workers).
+    """
+
+    name = 'memory'
+
+    def __init__(self, store: ExpiringSessionStore = None):
+        """
+        Initializes a new instance of the MemoryBackend class.
+        """
+
+        self.store = store if store is not None else ExpiringSessionStore()
+
+    def create(self, session_id: str, user_id: str, created_at: float,
+               ttl: float = None):
+        """
+        Stores a new session, expiring after ttl seconds (None: never).
+        """
+
+        self.store[session_id] = {'user_id': user_id,
+                                  'created_at': created_at}
+        if ttl is not None:
+            self.store.set_expiry(session_id, ttl)
+
+    def get(self, session_id: str, touch_ttl: float = None) -> dict:
+        """
+        Retrieves a live session, None if there is none.
+        """
+
+        session = self.store.get(session_id)
+        if session is not None and touch_ttl is not None:
+            self.store.set_expiry(session_id, touch_ttl)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Removes a session, returning whether it existed.
+        """
+
+        return self.store.pop(session_id) is not None
+
+    def close(self):
+        """
+        Stops the reaper thread of the store.
+        """
+
+        self.store.close()
+
+
+class FileBackend(SessionBackend):
+    """
+    Sessions saved as UserSession objects by the models storage engine
+    (JSON file or journal), shared by the workers of one host.
+    Expiry is checked on read.
+    """
+
+    name = 'file'
+
+    def __init__(self):
+        """
+        Initializes a new instance of the FileBackend class.
+        """
+
+        from models.user_session import UserSession
+
+        self._model = UserSession
+        self._lock = threading.Lock()
+
+    def _find(self, session_id: str):
+        """
+        Returns the UserSession of a session ID, None if there is none.
+        """
+
+        self._model.refresh_from_file()
+        sessions = self._model.search({'session_id': session_id})
+        return sessions[0] if sessions else None
+
+    def create(self, session_id: str, user_id: str, created_at: float,
+               ttl: float = None):
+        """
+        Stores a new session, expiring after ttl seconds (None: never).
+        """
+
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._model.refresh_from_file()
+            self._model(user_id=user_id, session_id=session_id,
+                        created_at=datetime.utcfromtimestamp(created_at)
+                        .strftime(TIMESTAMP_FORMAT),
+                        expires_at=expires_at).save()
+
+    def get(self, session_id: str, touch_ttl: float = None) -> dict:
+        """
+        Retrieves a live session, None if there is none.
+        """
+
+        with self._lock:
+            session = self._find(session_id)
+            if session is None:
+                return None
+            if (
+                session.expires_at is not None
+                and session.expires_at <= time.time()
+            ):
+                session.remove()
+                return None
+            if touch_ttl is not None:
+                session.expires_at = time.time() + touch_ttl
+                session.save()
+        created_at = (session.created_at - datetime(1970, 1, 1)) \
+            .total_seconds()
+        return {'user_id': session.user_id, 'created_at': created_at}
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Removes a session, returning whether it existed.
+        """
+
+        with self._lock:
+            session = self._find(session_id)
+            if session is None:
+                return False
+            session.remove()
+            return True
+
+
+class SQLiteBackend(SessionBackend):
+    """
+    Sessions in an SQLite database (WAL mode), shared by the workers of
+    one host. Each thread has its own connection; expired rows are
+    ignored on read and purged every purge_every writes.
+    """
+
+    name = 'sqlite'
+    purge_every = 1000
+
+    def __init__(self, path: str = '.db_sessions.sqlite3'):
+        """
+        Initializes a new instance of the SQLiteBackend class.
+        """
+
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL)")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_sessions_expires_at "
+                "ON sessions (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns the connection of the current thread.
+        """
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _purge(self, connection: sqlite3.Connection):
+        """
+        Deletes the expired rows once every purge_every writes.
+        """
+
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            connection.execute("DELETE FROM sessions WHERE expires_at <= ?",
+                               (time.time(),))
+
+    def create(self, session_id: str, user_id: str, created_at: float,
+               ttl: float = None):
+        """
+        Stores a new session, expiring after ttl seconds (None: never).
+        """
+
+        expires_at = None if ttl is None else time.time() + ttl
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (session_id, user_id, created_at, expires_at))
+            self._purge(connection)
+
+    def get(self, session_id: str, touch_ttl: float = None) -> dict:
+        """
+        Retrieves a live session, None if there is none.
+        """
+
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute(
+            "SELECT user_id, created_at FROM sessions WHERE id = ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (session_id, now)).fetchone()
+        if row is None:
+            return None
+        if touch_ttl is not None:
+            with connection:
+                connection.execute(
+                    "UPDATE sessions SET expires_at = ? WHERE id = ?",
+                    (now + touch_ttl, session_id))
+        return {'user_id': row[0], 'created_at': row[1]}
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Removes a session, returning whether it existed.
+        """
+
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute("DELETE FROM sessions WHERE id = ?",
+                                        (session_id,))
+        return cursor.rowcount > 0
+
+    def close(self):
+        """
+        Closes the connection of the current thread.
+        """
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class RedisBackend(SessionBackend):
+    """
+    Sessions as `session:<ID>` keys of a Redis-protocol server, shared by
+    every worker and host, expired natively by the server (EX/EXPIRE).
+    A lookup that extends the expiry sends GET and EXPIRE in one
+    pipelined round trip.
+    """
+
+    name = 'redis'
+    prefix = 'session:'
+
+    def __init__(self, client: RedisClient):
+        """
+        Initializes a new instance of the RedisBackend class.
+        """
+
+        self.client = client
+
+    def create(self, session_id: str, user_id: str, created_at: float,
+               ttl: float = None):
+        """
+        Stores a new session, expiring after ttl seconds (None: never).
+        """
+
+        value = json.dumps({'user_id': user_id, 'created_at': created_at})
+        command = ['SET', self.prefix + session_id, value]
+        if ttl is not None:
+            command += ['PX', max(1, int(ttl * 1000))]
+        self.client.execute(*command)
+
+    def get(self, session_id: str, touch_ttl: float = None) -> dict:
+        """
+        Retrieves a live session, None if there is none.
+        """
+
+        key = self.prefix + session_id
+        if touch_ttl is None:
+            value = self.client.execute('GET', key)
+        else:
+            value = self.client.pipeline([
+                ('GET', key),
+                ('PEXPIRE', key, max(1, int(touch_ttl * 1000)))])[0]
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Removes a session, returning whether it existed.
+        """
+
+        return self.client.execute('DEL', self.prefix + session_id) > 0
+
+    def close(self):
+        """
+        Closes the idle connections.
+        """
+
+        self.client.close()
+
+
+def session_backend_from_env() -> SessionBackend:
+    """
+    Creates the session backend selected by SESSION_BACKEND (`memory`,
+    the default, `file`, `sqlite` or `redis`) and SESSION_BACKEND_URL
+    (SQLite database path, or `redis://[:password@]host[:port][/db]`).
+    """
+
+    backend = os.getenv('SESSION_BACKEND', 'memory')
+    url = os.getenv('SESSION_BACKEND_URL')
+    if backend == 'file':
+        return FileBackend()
+    if backend == 'sqlite':
+        return SQLiteBackend(url or '.db_sessions.sqlite3')
+    if backend == 'redis':
+        return RedisBackend(RedisClient.from_url(
+            url or 'redis://localhost:6379/0'))
+    return MemoryBackend(session_store_from_env(expiring=True))
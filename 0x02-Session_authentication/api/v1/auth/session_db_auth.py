@@ -6,7 +6,11 @@ using a database to store user sessions.
 """
 from api.v1.auth.session_exp_auth import SessionExpAuth
 from models.user_session import UserSession
-from datetime import datetime, timedelta
+from datetime import datetime
+from uuid import uuid4
+import atexit
+import threading
+import time
 
 
 class SessionDBAuth(SessionExpAuth):
@@ -14,18 +18,55 @@ class SessionDBAuth(SessionExpAuth):
     This class inherits from the SessionExpAuth class
     and implements session-based authentication
     using a database to store user sessions.
+
+    Sessions are not kept in the in-memory store of SessionExpAuth, so
+    SESSION_MAX_SESSIONS and SESSION_EVICTION don't apply to them.
+
+    Last-seen updates (sliding expiration) are kept in memory and
+    written in batches: all pending updates are saved with one storage
+    write once every SESSION_TOUCH_INTERVAL seconds (by a daemon
+    thread, and at exit), or as soon as touch_batch_size sessions are
+    pending. Lookups use the pending time, so a reload of the sessions
+    meanwhile doesn't make an active session look idle.
     """
 
+    touch_batch_size = 100
+
+    def __init__(self):
+        """
+        Initializes a new instance of the SessionDBAuth class.
+        """
+
+        super().__init__()
+        self._pending_touches = {}
+        self._last_flush = time.monotonic()
+        self._touch_lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+        if self.idle_timeout > 0:
+            self.start_flusher(self.touch_interval)
+            atexit.register(self.close)
+
+    def _session_store(self) -> dict:
+        """
+        Sessions are only kept in the database: no in-memory store
+        (nor its cap and reaper thread).
+        """
+
+        return {}
+
     def create_session(self, user_id=None):
         """
         Creates a new session for the given user ID
         and saves it in the database.
         """
 
-        session_id = super().create_session(user_id)
-        if session_id is None:
+        if user_id is None or not isinstance(user_id, str):
             return None
 
+        session_id = str(uuid4())
+
+        UserSession.refresh_from_file()
         session = UserSession(user_id=user_id, session_id=session_id)
         session.save()
         return session_id
@@ -39,25 +80,108 @@ class SessionDBAuth(SessionExpAuth):
         if session_id is None:
             return None
 
-        UserSession.load_from_file()
+        UserSession.refresh_from_file()
         sessions = UserSession.search({'session_id': session_id})
         if not sessions:
             return None
 
         session = sessions[0]
 
-        if self.session_duration <= 0:
+        if self.session_duration <= 0 and self.idle_timeout <= 0:
             return session.user_id
 
         if not hasattr(session, 'created_at'):
             return None
 
-        if (session.created_at + timedelta(
-                seconds=self.session_duration)) < datetime.now():
+        # model timestamps are in UTC
+        now = datetime.utcnow()
+        last_seen = session.last_seen_at or session.created_at
+        pending = self._pending_touches.get(session.id)
+        if pending is not None and pending > last_seen:
+            last_seen = pending
+        if self._expired(session.created_at, last_seen, now):
             return None
 
+        if self._needs_touch(last_seen, now):
+            session.last_seen_at = now
+            self._touch(session.id, now)
+
         return session.user_id
 
+    def _touch(self, obj_id: str, seen_at: datetime):
+        """
+        Queues the last-seen update of a session,
+        writing the queue when it is due.
+        """
+
+        with self._touch_lock:
+            self._pending_touches[obj_id] = seen_at
+            if (
+                len(self._pending_touches) < self.touch_batch_size
+                and time.monotonic() - self._last_flush
+                < self.touch_interval
+            ):
+                return
+            pending = self._pending_touches
+            self._pending_touches = {}
+            self._last_flush = time.monotonic()
+        self._save_touches(pending)
+
+    def flush_touches(self):
+        """
+        Writes all queued last-seen updates.
+        """
+
+        with self._touch_lock:
+            pending = self._pending_touches
+            self._pending_touches = {}
+            self._last_flush = time.monotonic()
+        self._save_touches(pending)
+
+    def start_flusher(self, interval: float):
+        """
+        Writes the queued last-seen updates every interval seconds
+        in a daemon thread.
+        """
+
+        if self._flusher is not None or interval <= 0:
+            return
+
+        def flush():
+            while not self._stop.wait(interval):
+                self.flush_touches()
+
+        self._flusher = threading.Thread(target=flush, daemon=True,
+                                         name='session-touch-flusher')
+        self._flusher.start()
+
+    def close(self):
+        """
+        Stops the flusher thread and writes the queued updates.
+        """
+
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush_touches()
+
+    @staticmethod
+    def _save_touches(pending: dict):
+        """
+        Saves the last-seen times of sessions in a single storage write.
+        """
+
+        touched = []
+        for obj_id, seen_at in pending.items():
+            session = UserSession.get(obj_id)
+            if session is None:
+                continue
+            if session.last_seen_at is None or session.last_seen_at < seen_at:
+                session.last_seen_at = seen_at
+            touched.append(session)
+        UserSession.save_many(touched)
+
     def destroy_session(self, request=None):
         """
         Removes the session associated with the
@@ -71,7 +195,7 @@ class SessionDBAuth(SessionExpAuth):
         if not session_id:
             return False
 
-        UserSession.load_from_file()
+        UserSession.refresh_from_file()
 
         sessions = UserSession.search({'session_id': session_id})
         if not sessions:
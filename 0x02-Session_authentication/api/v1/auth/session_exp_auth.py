@@ -6,14 +6,36 @@ It provides session-based authentication
 with session expiration functionality.
 """
 from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_store import SessionLimitError
+from api.v1.auth.session_store import session_store_from_env
 import os
 from datetime import datetime, timedelta
 
 
+def _seconds_from_env(name: str, default: int = 0) -> int:
+    """
+    Reads a number of seconds from the environment.
+    """
+
+    try:
+        return int(os.getenv(name))
+    except Exception:
+        return default
+
+
 class SessionExpAuth(SessionAuth):
     """
     This class provides session-based authentication
     with session expiration functionality.
+
+    A session expires SESSION_DURATION seconds after its creation
+    (absolute cap) and, with SESSION_IDLE_TIMEOUT, after that many
+    seconds without requests (sliding expiration). The last-seen time
+    is only updated once every SESSION_TOUCH_INTERVAL seconds (at most
+    half the idle timeout), so idle sessions may expire that much early.
+
+    Sessions are kept in an ExpiringSessionStore of the instance,
+    which forgets them once they expire.
     """
 
     def __init__(self):
@@ -21,27 +43,76 @@ class SessionExpAuth(SessionAuth):
         Initializes a new instance of the SessionExpAuth class.
         """
 
-        session_duration = os.getenv('SESSION_DURATION')
-        try:
-            self.session_duration = int(session_duration)
-        except Exception:
-            self.session_duration = 0
+        self.session_duration = _seconds_from_env('SESSION_DURATION')
+        self.idle_timeout = _seconds_from_env('SESSION_IDLE_TIMEOUT')
+        self.touch_interval = _seconds_from_env('SESSION_TOUCH_INTERVAL', 60)
+        if self.idle_timeout > 0:
+            self.touch_interval = min(self.touch_interval,
+                                      self.idle_timeout / 2)
+        self.user_id_by_session_id = self._session_store()
+
+    def _session_store(self):
+        """
+        Creates the in-memory store of the sessions.
+        """
+
+        return session_store_from_env(
+            self._time_left(datetime.now(), datetime.now()))
+
+    def _time_left(self, created_at: datetime, now: datetime) -> float:
+        """
+        Computes how many seconds a session just seen can live
+        (0 if it never expires).
+        """
+
+        limits = []
+        if self.session_duration > 0:
+            limits.append(self.session_duration
+                          - (now - created_at).total_seconds())
+        if self.idle_timeout > 0:
+            limits.append(self.idle_timeout)
+        return max(min(limits), 0.001) if limits else 0
+
+    def _expired(self, created_at: datetime, last_seen: datetime,
+                 now: datetime) -> bool:
+        """
+        Checks if a session reached its absolute or idle expiration.
+        """
+
+        if self.session_duration > 0 and created_at + timedelta(
+                seconds=self.session_duration) < now:
+            return True
+        if self.idle_timeout > 0 and last_seen + timedelta(
+                seconds=self.idle_timeout) < now:
+            return True
+        return False
+
+    def _needs_touch(self, last_seen: datetime, now: datetime) -> bool:
+        """
+        Checks if the last-seen time of a session is due for an update.
+        """
+
+        return self.idle_timeout > 0 and last_seen + timedelta(
+            seconds=self.touch_interval) <= now
 
     def create_session(self, user_id=None):
         """
         Creates a new session for the specified user.
         """
 
-        session_id = super().create_session(user_id)
-        if session_id is None:
-            return None
+        try:
+            session_id = super().create_session(user_id)
+            if session_id is None:
+                return None
 
-        session_dict = {
-            'user_id': user_id,
-            'created_at': datetime.now()
-        }
+            session_dict = {
+                'user_id': user_id,
+                'created_at': datetime.now()
+            }
 
-        self.user_id_by_session_id[session_id] = session_dict
+            self.user_id_by_session_id[session_id] = session_dict
+        except SessionLimitError:
+            return None
 
         return session_id
 
@@ -57,15 +128,21 @@ class SessionExpAuth(SessionAuth):
         if session_dict is None:
             return None
 
-        if self.session_duration <= 0:
+        if self.session_duration <= 0 and self.idle_timeout <= 0:
             return session_dict.get('user_id')
 
         created_at = session_dict.get('created_at')
         if created_at is None:
             return None
 
-        if created_at + timedelta(
-                seconds=self.session_duration) < datetime.now():
+        now = datetime.now()
+        last_seen = session_dict.get('last_seen') or created_at
+        if self._expired(created_at, last_seen, now):
             return None
 
+        if self._needs_touch(last_seen, now):
+            session_dict['last_seen'] = now
+            self.user_id_by_session_id.set_expiry(
+                session_id, self._time_left(created_at, now))
+
         return session_dict.get('user_id')
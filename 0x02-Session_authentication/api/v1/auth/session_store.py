@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+This module contains the ExpiringSessionStore class, a session ID to
+session mapping that forgets sessions once they expire.
+"""
+from collections import OrderedDict
+import heapq
+import os
+import threading
+import time
+
+
+class SessionLimitError(Exception):
+    """
+    Raised when a session is added to a full store that rejects new ones.
+    """
+
+
+class ExpiringSessionStore:
+    """
+    Mapping of session IDs to sessions, each expiring ttl seconds after
+    it was stored (never if ttl <= 0), or when set by set_expiry.
+
+    Expiry times are kept in a min-heap: every write pops a bounded batch
+    of expired sessions, reads drop the session they find expired, and an
+    optional reaper thread sweeps the rest periodically, so memory stays
+    proportional to the live sessions. With max_sessions, a new session
+    in a full store either evicts the oldest one (eviction='oldest') or
+    raises SessionLimitError (eviction='reject').
+    """
+
+    def __init__(self, ttl: float = 0, max_sessions: int = 0,
+                 eviction: str = 'oldest', sweep_batch: int = 64):
+        """
+        Initializes a new instance of the ExpiringSessionStore class.
+        """
+
+        if eviction not in ('oldest', 'reject'):
+            raise ValueError("eviction must be 'oldest' or 'reject'")
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.eviction = eviction
+        self.sweep_batch = sweep_batch
+        self.expired = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+        self._heap = []
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._stop = threading.Event()
+
+    def _expires_at(self) -> float:
+        """
+        Computes the expiry time of a session stored now.
+        """
+
+        if self.ttl <= 0:
+            return None
+        return time.monotonic() + self.ttl
+
+    def _sweep(self, limit: int = None) -> int:
+        """
+        Removes up to limit expired sessions (all if None), the lock
+        being held, and returns how many were removed.
+        """
+
+        now = time.monotonic()
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            if limit is not None and removed >= limit:
+                break
+            expires_at, session_id = heapq.heappop(self._heap)
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[session_id]
+                self.expired += 1
+                removed += 1
+        if len(self._heap) > 2 * len(self._entries) + self.sweep_batch:
+            # drop the heap items of removed or replaced sessions
+            self._heap = [(entry[0], session_id)
+                          for session_id, entry in self._entries.items()
+                          if entry[0] is not None]
+            heapq.heapify(self._heap)
+        return removed
+
+    def _live(self, session_id: str):
+        """
+        Returns the entry of a session if it hasn't expired, the lock
+        being held, dropping it otherwise.
+        """
+
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            del self._entries[session_id]
+            self.expired += 1
+            return None
+        return entry
+
+    def __setitem__(self, session_id: str, session):
+        """
+        Stores a session, replacing any session with the same ID.
+        """
+
+        with self._lock:
+            self._sweep(self.sweep_batch)
+            if session_id in self._entries:
+                del self._entries[session_id]
+            elif 0 < self.max_sessions <= len(self._entries):
+                self._sweep()
+                if len(self._entries) >= self.max_sessions:
+                    if self.eviction == 'reject':
+                        raise SessionLimitError(
+                            "Too many sessions ({})".format(
+                                self.max_sessions))
+                    self._entries.popitem(last=False)
+                    self.evicted += 1
+
+            expires_at = self._expires_at()
+            self._entries[session_id] = (expires_at, session)
+            if expires_at is not None:
+                heapq.heappush(self._heap, (expires_at, session_id))
+
+    def set_expiry(self, session_id: str, ttl: float):
+        """
+        Makes a live session expire ttl seconds from now.
+        """
+
+        with self._lock:
+            entry = self._live(session_id)
+            if entry is None:
+                return
+            expires_at = time.monotonic() + ttl
+            self._entries[session_id] = (expires_at, entry[1])
+            heapq.heappush(self._heap, (expires_at, session_id))
+
+    def __getitem__(self, session_id: str):
+        """
+        Retrieves a live session, raising KeyError if there is none.
+        """
+
+        with self._lock:
+            entry = self._live(session_id)
+        if entry is None:
+            raise KeyError(session_id)
+        return entry[1]
+
+    def get(self, session_id: str, default=None):
+        """
+        Retrieves a live session, default if there is none.
+        """
+
+        with self._lock:
+            entry = self._live(session_id)
+        return default if entry is None else entry[1]
+
+    def __contains__(self, session_id: str) -> bool:
+        """
+        Checks if a session is live.
+        """
+
+        with self._lock:
+            return self._live(session_id) is not None
+
+    def __delitem__(self, session_id: str):
+        """
+        Removes a session, raising KeyError if there is none.
+        """
+
+        with self._lock:
+            del self._entries[session_id]
+
+    def pop(self, session_id: str, default=None):
+        """
+        Removes a session and returns it, default if there is none.
+        """
+
+        with self._lock:
+            entry = self._live(session_id)
+            if entry is None:
+                return default
+            del self._entries[session_id]
+            return entry[1]
+
+    def __len__(self) -> int:
+        """
+        Returns the number of stored sessions (expired ones included
+        until they are swept).
+        """
+
+        return len(self._entries)
+
+    def clear(self):
+        """
+        Removes all sessions.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+
+    def sweep(self) -> int:
+        """
+        Removes all expired sessions and returns how many there were.
+        """
+
+        with self._lock:
+            return self._sweep()
+
+    def start_reaper(self, interval: float):
+        """
+        Sweeps expired sessions every interval seconds in a daemon thread.
+        """
+
+        if self._reaper is not None or interval <= 0:
+            return
+
+        def reap():
+            while not self._stop.wait(interval):
+                self.sweep()
+
+        self._reaper = threading.Thread(target=reap, daemon=True,
+                                        name='session-reaper')
+        self._reaper.start()
+
+    def close(self):
+        """
+        Stops the reaper thread.
+        """
+
+        self._stop.set()
+        if self._reaper is not None:
+            self._reaper.join()
+            self._reaper = None
+
+    def stats(self) -> dict:
+        """
+        Returns the live/expired/evicted session counters of the store.
+        """
+
+        with self._lock:
+            self._sweep(self.sweep_batch)
+            return {
+                'live': len(self._entries),
+                'max_sessions': self.max_sessions,
+                'expired': self.expired,
+                'evicted': self.evicted,
+            }
+
+
+def session_store_from_env(ttl: float = 0,
+                           expiring: bool = None) -> ExpiringSessionStore:
+    """
+    Creates the session store configured by SESSION_MAX_SESSIONS
+    (0: no limit), SESSION_EVICTION (`oldest` or `reject`) and
+    SESSION_REAPER_INTERVAL (in seconds, 0 disables the reaper thread).
+    The reaper only runs if sessions expire (default: if ttl > 0).
+    """
+
+    try:
+        max_sessions = int(os.getenv('SESSION_MAX_SESSIONS', '0'))
+    except ValueError:
+        max_sessions = 0
+    eviction = os.getenv('SESSION_EVICTION', 'oldest')
+    if eviction not in ('oldest', 'reject'):
+        eviction = 'oldest'
+    try:
+        interval = float(os.getenv('SESSION_REAPER_INTERVAL', '60'))
+    except ValueError:
+        interval = 60
+    store = ExpiringSessionStore(ttl, max_sessions, eviction)
+    if expiring or (expiring is None and ttl > 0):
+        store.start_reaper(interval)
+    return store
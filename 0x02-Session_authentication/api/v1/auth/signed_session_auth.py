@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+This module contains the SignedSessionAuth class,
+which issues stateless session cookies signed with HMAC-SHA256.
+"""
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_exp_auth import _seconds_from_env
+from api.v1.auth.session_store import ExpiringSessionStore
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+
+
+def _b64encode(data: bytes) -> str:
+    """
+    Encodes bytes as unpadded URL-safe base64.
+    """
+
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    """
+    Decodes unpadded URL-safe base64.
+    """
+
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class SignedSessionAuth(SessionAuth):
+    """
+    This class provides session-based authentication without a session
+    store: the session ID is a token `<key id>.<user id>.<issued at>.
+    <token id>.<signature>` that the server verifies with its keys.
+
+    SESSION_SIGNING_KEYS lists the keys separated by commas: the first
+    one signs new tokens, all of them are accepted, so a key can be
+    rotated by putting the new one first and dropping the old one after
+    SESSION_DURATION. Without keys, a random key is generated and tokens
+    only work with this process.
+
+    Tokens expire SESSION_DURATION seconds after being issued (default
+    DEFAULT_DURATION: a token can't be revoked for ever). Logging out
+    revokes the token ID in a bounded per-process list of up to
+    SESSION_REVOCATION_SIZE entries (default 10000, 0 disables it), each
+    kept until the token expires; when the list is full, logging out
+    raises SessionLimitError rather than forgetting a revocation.
+    """
+
+    DEFAULT_DURATION = 3600
+
+    def __init__(self, keys: list = None):
+        """
+        Initializes a new instance of the SignedSessionAuth class.
+        """
+
+        if keys is None:
+            keys = [key.strip() for key in os.getenv(
+                'SESSION_SIGNING_KEYS', '').split(',') if key.strip()]
+        if not keys:
+            keys = [secrets.token_urlsafe(32)]
+        self.keys = {}
+        for key in keys:
+            if isinstance(key, str):
+                key = key.encode()
+            self.keys.setdefault(hashlib.sha256(key).hexdigest()[:8], key)
+        self.key_id = next(iter(self.keys))
+
+        self.session_duration = _seconds_from_env('SESSION_DURATION')
+        if self.session_duration <= 0:
+            self.session_duration = self.DEFAULT_DURATION
+        revocation_size = _seconds_from_env('SESSION_REVOCATION_SIZE', 10000)
+        self.revoked = None
+        if revocation_size > 0:
+            self.revoked = ExpiringSessionStore(
+                self.session_duration, revocation_size, 'reject')
+
+    def _sign(self, key: bytes, payload: str) -> str:
+        """
+        Computes the signature of a token payload.
+        """
+
+        return _b64encode(hmac.digest(key, payload.encode(), 'sha256'))
+
+    def _verify(self, token: str) -> tuple:
+        """
+        Checks the signature and expiry of a token and returns its
+        (user ID, issued at, token ID), None if it is not valid.
+        """
+
+        try:
+            payload, signature = token.rsplit('.', 1)
+            key_id, user_id, issued_at, token_id = payload.split('.')
+        except ValueError:
+            return None
+        key = self.keys.get(key_id)
+        if key is None or not hmac.compare_digest(
+                signature, self._sign(key, payload)):
+            return None
+
+        issued_at = int(issued_at)
+        if issued_at + self.session_duration < time.time():
+            return None
+        if self.revoked is not None and token_id in self.revoked:
+            return None
+        return _b64decode(user_id).decode(), issued_at, token_id
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        Issues a signed token for the given user ID.
+        """
+
+        if user_id is None or not isinstance(user_id, str):
+            return None
+
+        payload = '.'.join((self.key_id, _b64encode(user_id.encode()),
+                            str(int(time.time())),
+                            secrets.token_urlsafe(12)))
+        return '{}.{}'.format(payload,
+                              self._sign(self.keys[self.key_id], payload))
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """
+        Retrieves the user ID of a valid token.
+        """
+
+        if session_id is None or not isinstance(session_id, str):
+            return None
+
+        claims = self._verify(session_id)
+        if claims is None:
+            return None
+        return claims[0]
+
+    def destroy_session(self, request=None):
+        """
+        Revokes the token of the request
+        (SessionLimitError if the revocation list is full).
+        """
+
+        if request is None:
+            return False
+
+        session_id = self.session_cookie(request)
+        if not session_id:
+            return False
+
+        claims = self._verify(session_id)
+        if claims is None:
+            return False
+
+        if self.revoked is not None:
+            self.revoked[claims[2]] = True
+            self.revoked.set_expiry(
+                claims[2],
+                max(claims[1] + self.session_duration - time.time(), 0.001))
+        return True
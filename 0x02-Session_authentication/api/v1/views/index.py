@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """ Module of Index views
 """
-from flask import jsonify, abort
+from flask import Response, jsonify, abort
 from api.v1.views import app_views
 
 
@@ -19,13 +19,33 @@ def stats() -> str:
     """ GET /api/v1/stats
     Return:
       - the number of each objects
+      - the Basic auth credential cache counters (if enabled)
+      - the session store counters (session expiration auth)
     """
     from models.user import User
+    from api.v1.app import auth
     stats = {}
     stats['users'] = User.count()
+    if hasattr(auth, 'credential_cache'):
+        stats['basic_auth_cache'] = auth.credential_cache.stats()
+    if hasattr(getattr(auth, 'user_id_by_session_id', None), 'stats'):
+        stats['sessions'] = auth.user_id_by_session_id.stats()
     return jsonify(stats)
 
 
+@app_views.route('/metrics', methods=['GET'], strict_slashes=False)
+def metrics() -> str:
+    """ GET /api/v1/metrics
+    Return:
+      - the request timing histograms in Prometheus text format
+        (404 unless API_METRICS=1)
+    """
+    from api.v1.metrics import METRICS_ENABLED, render
+    if not METRICS_ENABLED:
+        abort(404)
+    return Response(render(), mimetype="text/plain; version=0.0.4")
+
+
 @app_views.route('/unauthorized/', strict_slashes=False)
 def unauthorized() -> str:
     """ GET /api/v1/unauthorized
@@ -3,6 +3,7 @@
 This module contains the routes and functions
 related to session authentication.
 """
+from api.v1.auth.session_store import SessionLimitError
 from api.v1.views import app_views
 from flask import request, jsonify, abort
 from models.user import User
@@ -34,6 +35,8 @@ def login():
 
         from api.v1.app import auth
         session_id = auth.create_session(user.id)
+        if session_id is None:
+            return jsonify({"error": "too many sessions"}), 503
         user_json_repr = user.to_json()
         response = jsonify(user_json_repr)
         session_name = os.getenv('SESSION_NAME')
@@ -51,7 +54,11 @@ def logout():
     """
 
     from api.v1.app import auth
-    if not auth.destroy_session(request):
+    try:
+        destroyed = auth.destroy_session(request)
+    except SessionLimitError:
+        return jsonify({"error": "too many sessions"}), 503
+    if not destroyed:
         abort(404)
 
     return jsonify({}), 200
@@ -2,6 +2,7 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
+from api.v1.auth.context import current_user
 from flask import abort, jsonify, request
 from models.user import User
 
@@ -28,10 +29,11 @@ def view_one_user(user_id: str = None) -> str:
     if user_id is None:
         abort(404)
     if user_id == 'me':
-        if request.current_user is None:
+        user = current_user()
+        if user is None:
             abort(404)
         else:
-            return jsonify(request.current_user.to_json())
+            return jsonify(user.to_json())
     user = User.get(user_id)
     if user is None:
         abort(404)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+""" Multi-threaded stress test and throughput of the models store
+
+Threads run a mix of `User.get`, `User.search` (by email through the
+index, and by a non-indexed attribute), `save` of users they own (some
+changing their email), `refresh_from_file` and `load_from_file`, and
+check their own results as they go: a search by the current email of
+an owned user returns exactly that user, `get` never misses, and no
+call raises. Once all threads are done, the in-memory objects, the
+indexes and the storage file must agree. tests/test_concurrency.py
+checks the same invariants (with removals) in a short run.
+
+Usage (from the project root):
+    $ python3 -m benchmarks.concurrency [--users N] [--ops N]
+          [--threads 1,4,16]
+
+Exit status 1 if any check failed.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.search import write_users
+from models.base import DATA, STORAGE
+from models.user import User
+
+
+def worker(index: int, threads: int, ops: int, ids: list,
+           errors: list, barrier: threading.Barrier):
+    """ Run `ops` operations, only changing the users it owns
+    (every `threads`-th user from `index`)
+    """
+    rand = random.Random(index)
+    owned = [User.get(obj_id) for obj_id in ids[index::threads]]
+    barrier.wait()
+    try:
+        for i in range(ops):
+            draw = rand.random()
+            if draw < 0.55:
+                if User.get(rand.choice(ids)) is None:
+                    errors.append("get missed an object")
+            elif draw < 0.80:
+                user = rand.choice(owned)
+                email = user.email
+                found = User.search({'email': email})
+                if len(found) != 1 or found[0].id != user.id:
+                    errors.append("search by {} returned {} objects"
+                                  .format(email, len(found)))
+            elif draw < 0.93:
+                user = rand.choice(owned)
+                user.first_name = "t{}-{}".format(index, i)
+                if draw < 0.86:
+                    user.email = "t{}-{}@example.com".format(index, i)
+                user.save()
+            elif draw < 0.98:
+                User.search({'first_name': "t{}-{}".format(index, i - 1)})
+            elif draw < 0.995:
+                User.refresh_from_file()
+            else:
+                User.load_from_file()
+                owned = [User.get(user.id) for user in owned]
+    except Exception as e:
+        errors.append("{}: {}".format(type(e).__name__, e))
+
+
+def check_consistency(ids: list, errors: list):
+    """ Check that memory, indexes and the storage file agree
+    """
+    if User.count() != len(ids):
+        errors.append("{} objects instead of {}".format(User.count(),
+                                                        len(ids)))
+    in_memory = {obj_id: (user.email, user.first_name)
+                 for obj_id, user in DATA['User'].items()}
+    for obj_id, (email, _) in in_memory.items():
+        found = User.search({'email': email})
+        if len(found) != 1 or found[0].id != obj_id:
+            errors.append("index out of date for {}".format(email))
+    User.load_from_file()
+    on_file = {obj_id: (user.email, user.first_name)
+               for obj_id, user in DATA['User'].items()}
+    if on_file != in_memory:
+        errors.append("storage file differs from memory")
+
+
+def run(users: int, ops: int, threads: int) -> tuple:
+    """ Stress `threads` threads and return (ops/s, errors)
+    """
+    write_users(users)
+    # a fresh storage file of the configured engine (journal: imported)
+    for path in os.listdir("."):
+        if path.startswith(".db_User.") and path != ".db_User.json":
+            os.remove(path)
+    STORAGE.stamps.clear()
+    User.load_from_file()
+    ids = list(DATA['User'].keys())
+    errors = []
+    barrier = threading.Barrier(threads + 1)
+    workers = [threading.Thread(target=worker, args=(
+        i, threads, ops // threads, ids, errors, barrier))
+        for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    check_consistency(ids, errors)
+    return (ops // threads) * threads / elapsed, errors
+
+
+def main() -> int:
+    """ Run the stress test at each thread count
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--threads", default="1,4,16")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            print("{:>8} {:>12} {:>8}".format("threads", "ops/s", "errors"))
+            for threads in map(int, args.threads.split(",")):
+                throughput, errors = run(args.users, args.ops, threads)
+                print("{:>8} {:>12.0f} {:>8}".format(threads, throughput,
+                                                     len(errors)))
+                for error in sorted(set(errors))[:5]:
+                    print("    {}".format(error))
+                failed = failed or bool(errors)
+        finally:
+            os.chdir(cwd)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
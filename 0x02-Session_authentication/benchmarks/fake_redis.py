@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+""" Tiny in-memory Redis-protocol (RESP2) server, to run the redis
+session backend and its benchmarks offline
+
+Supports PING, ECHO, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, EXISTS,
+EXPIRE, PEXPIRE, TTL, PTTL, DBSIZE, FLUSHDB and QUIT, with expiry.
+Pipelined commands are answered in order.
+
+Usage (from the project root):
+    $ python3 -m benchmarks.fake_redis [port]
+"""
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+
+class FakeRedis():
+    """ Keys, values and expiry times shared by all connections
+    """
+
+    def __init__(self):
+        """ Initialize an empty FakeRedis
+        """
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def _get(self, key: bytes):
+        """ Return the entry of a live key, the lock being held
+        """
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None \
+                and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, args: list) -> bytes:
+        """ Run one command and return its encoded reply
+        """
+        if not args:
+            return error("ERR empty command")
+        name = args[0].upper().decode()
+        handler = getattr(self, "cmd_{}".format(name.lower()), None)
+        if handler is None:
+            return error("ERR unknown command '{}'".format(name))
+        try:
+            with self.lock:
+                return handler(*args[1:])
+        except (TypeError, ValueError):
+            return error("ERR wrong arguments for '{}'".format(name))
+
+    def cmd_ping(self, message: bytes = None) -> bytes:
+        """ PING [message]
+        """
+        return simple("PONG") if message is None else bulk(message)
+
+    def cmd_echo(self, message: bytes) -> bytes:
+        """ ECHO message
+        """
+        return bulk(message)
+
+    def cmd_auth(self, *args) -> bytes:
+        """ AUTH [user] password (any password is accepted)
+        """
+        return simple("OK")
+
+    def cmd_select(self, db: bytes) -> bytes:
+        """ SELECT db (a single keyspace is shared)
+        """
+        int(db)
+        return simple("OK")
+
+    def cmd_get(self, key: bytes) -> bytes:
+        """ GET key
+        """
+        entry = self._get(key)
+        return bulk(None if entry is None else entry[0])
+
+    def cmd_set(self, key: bytes, value: bytes, *options) -> bytes:
+        """ SET key value [EX seconds|PX milliseconds] [NX|XX]
+        """
+        expires_at = None
+        only_new = only_existing = False
+        options = [option.upper() for option in options]
+        i = 0
+        while i < len(options):
+            if options[i] in (b"EX", b"PX"):
+                unit = 1 if options[i] == b"EX" else 0.001
+                expires_at = time.monotonic() + int(options[i + 1]) * unit
+                i += 2
+                continue
+            if options[i] == b"NX":
+                only_new = True
+            elif options[i] == b"XX":
+                only_existing = True
+            else:
+                raise ValueError(options[i])
+            i += 1
+        exists = self._get(key) is not None
+        if (only_new and exists) or (only_existing and not exists):
+            return bulk(None)
+        self.data[key] = (value, expires_at)
+        return simple("OK")
+
+    def cmd_del(self, *keys) -> bytes:
+        """ DEL key [key ...]
+        """
+        removed = 0
+        for key in keys:
+            if self._get(key) is not None:
+                del self.data[key]
+                removed += 1
+        return integer(removed)
+
+    def cmd_exists(self, *keys) -> bytes:
+        """ EXISTS key [key ...]
+        """
+        return integer(sum(self._get(key) is not None for key in keys))
+
+    def cmd_pexpire(self, key: bytes, milliseconds: bytes) -> bytes:
+        """ PEXPIRE key milliseconds
+        """
+        entry = self._get(key)
+        if entry is None:
+            return integer(0)
+        self.data[key] = (entry[0],
+                          time.monotonic() + int(milliseconds) / 1000)
+        return integer(1)
+
+    def cmd_expire(self, key: bytes, seconds: bytes) -> bytes:
+        """ EXPIRE key seconds
+        """
+        return self.cmd_pexpire(key, str(int(seconds) * 1000).encode())
+
+    def cmd_pttl(self, key: bytes) -> bytes:
+        """ PTTL key
+        """
+        entry = self._get(key)
+        if entry is None:
+            return integer(-2)
+        if entry[1] is None:
+            return integer(-1)
+        return integer(int((entry[1] - time.monotonic()) * 1000))
+
+    def cmd_ttl(self, key: bytes) -> bytes:
+        """ TTL key
+        """
+        entry = self._get(key)
+        if entry is None:
+            return integer(-2)
+        if entry[1] is None:
+            return integer(-1)
+        return integer(int(entry[1] - time.monotonic()))
+
+    def cmd_dbsize(self) -> bytes:
+        """ DBSIZE
+        """
+        now = time.monotonic()
+        return integer(sum(1 for _, expires_at in self.data.values()
+                           if expires_at is None or expires_at > now))
+
+    def cmd_flushdb(self, *args) -> bytes:
+        """ FLUSHDB
+        """
+        self.data.clear()
+        return simple("OK")
+
+
+def simple(message: str) -> bytes:
+    """ Encode a simple string reply
+    """
+    return "+{}\r\n".format(message).encode()
+
+
+def error(message: str) -> bytes:
+    """ Encode an error reply
+    """
+    return "-{}\r\n".format(message).encode()
+
+
+def integer(value: int) -> bytes:
+    """ Encode an integer reply
+    """
+    return ":{}\r\n".format(value).encode()
+
+
+def bulk(value: bytes) -> bytes:
+    """ Encode a bulk string reply (None: null bulk string)
+    """
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    """ Serve the commands of one connection
+    """
+
+    def setup(self):
+        """ Send each reply at once (no Nagle delay on small replies)
+        """
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().setup()
+
+    def read_command(self) -> list:
+        """ Read one command (RESP array of bulk strings, or inline)
+        """
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        """ Answer commands until the client disconnects
+        """
+        while True:
+            try:
+                args = self.read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            if args and args[0].upper() == b"QUIT":
+                self.wfile.write(simple("OK"))
+                return
+            self.wfile.write(self.server.redis.execute(args))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """ Threaded FakeRedis server, port 0 picking a free port
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """ Initialize a FakeRedisServer
+        """
+        super().__init__((host, port), RESPHandler)
+        self.redis = FakeRedis()
+
+    @property
+    def url(self) -> str:
+        """ URL of the server for RedisClient.from_url
+        """
+        host, port = self.server_address[:2]
+        return "redis://{}:{}/0".format(host, port)
+
+    def start(self) -> 'FakeRedisServer':
+        """ Serve in a daemon thread
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+    with FakeRedisServer("0.0.0.0", port) as server:
+        print("Fake Redis listening on {}".format(server.url))
+        server.serve_forever()
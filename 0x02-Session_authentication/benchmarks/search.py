@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+""" Benchmark of User.search by email: secondary index vs linear scan
+
+Usage (from the project root):
+    $ python3 -m benchmarks.search [size ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from models.base import DATA
+from models.user import User
+
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+LOOKUPS = 1000
+
+
+def write_users(size: int):
+    """ Write a .db_User.json file with `size` users in the current folder
+    """
+    objs_json = {}
+    for i in range(size):
+        obj_id = str(uuid.uuid4())
+        objs_json[obj_id] = {
+            'id': obj_id,
+            'created_at': "2024-01-01T00:00:00",
+            'updated_at': "2024-01-01T00:00:00",
+            'email': "user{}@example.com".format(i),
+            '_password': None,
+            'first_name': None,
+            'last_name': None,
+        }
+    with open(".db_User.json", 'w') as f:
+        json.dump(objs_json, f)
+
+
+def linear_search(attributes: dict) -> list:
+    """ Search like before the indexes: filter over every object
+    """
+    return [obj for obj in DATA['User'].values()
+            if all(getattr(obj, k) == v for k, v in attributes.items())]
+
+
+def time_lookups(search, size: int, lookups: int) -> float:
+    """ Return the mean latency (in microseconds) of `lookups` searches
+    """
+    step = max(1, size // lookups)
+    emails = ["user{}@example.com".format(i)
+              for i in range(0, size, step)][:lookups]
+    start = time.perf_counter()
+    for email in emails:
+        assert len(search({'email': email})) == 1
+    return (time.perf_counter() - start) / len(emails) * 1e6
+
+
+def run(size: int):
+    """ Load `size` users and print the lookup latency
+    """
+    write_users(size)
+    User.load_from_file()
+    indexed = time_lookups(User.search, size, LOOKUPS)
+    linear = time_lookups(linear_search, size, max(1, LOOKUPS // 100))
+    print("{:>9} users: indexed {:>10.2f} us  linear {:>12.2f} us"
+          .format(size, indexed, linear))
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            for size in sizes:
+                run(size)
+        finally:
+            os.chdir(cwd)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+""" Benchmark of the session backends of SessionBackendAuth
+
+Measures the latency of creating a session and of looking it up (with
+and without pushing back its expiry) for each backend: memory, file,
+SQLite and Redis protocol. Without --redis-url, the Redis backend runs
+against the in-process fake server of benchmarks.fake_redis.
+
+Usage (from the project root):
+    $ python3 -m benchmarks.session_backends [--sessions N] [--repeat N]
+          [--redis-url redis://host:port/db]
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from uuid import uuid4
+
+from api.v1.auth.redis_client import RedisClient
+from api.v1.auth.session_backends import FileBackend, MemoryBackend
+from api.v1.auth.session_backends import RedisBackend, SQLiteBackend
+from benchmarks.fake_redis import FakeRedisServer
+from benchmarks.suite import measure
+
+
+def bench_backend(backend, sessions: int, repeat: int) -> dict:
+    """ Benchmark create/get/get+touch of one backend
+    """
+    ops = max(1, sessions // 10) if backend.name == 'file' else sessions
+    ids = [str(uuid4()) for _ in range(ops * repeat)]
+    new_ids = iter(ids)
+    results = {}
+    results['create'] = measure(
+        lambda: backend.create(next(new_ids), "user", time.time(), 3600),
+        ops, repeat)
+    existing = itertools.cycle(ids)
+    results['get'] = measure(lambda: backend.get(next(existing)),
+                             ops, repeat)
+    results['get+touch'] = measure(
+        lambda: backend.get(next(existing), 3600), ops, repeat)
+    return results
+
+
+def bench_pipeline(client: RedisClient, sessions: int,
+                   repeat: int) -> dict:
+    """ Compare GET then PEXPIRE in two round trips and pipelined
+    """
+    client.execute('SET', 'session:bench', '{}')
+    return {
+        'sequential': measure(lambda: (
+            client.execute('GET', 'session:bench'),
+            client.execute('PEXPIRE', 'session:bench', 3600000)),
+            sessions, repeat),
+        'pipelined': measure(lambda: client.pipeline([
+            ('GET', 'session:bench'),
+            ('PEXPIRE', 'session:bench', 3600000)]), sessions, repeat),
+    }
+
+
+def main():
+    """ Run the benchmarks and print a table
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    server = None
+    if args.redis_url is None:
+        server = FakeRedisServer().start()
+        args.redis_url = server.url
+    client = RedisClient.from_url(args.redis_url)
+
+    workdir = tempfile.mkdtemp(prefix="session_backends_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        backends = [MemoryBackend(), FileBackend(),
+                    SQLiteBackend(os.path.join(workdir, "sessions.db")),
+                    RedisBackend(client)]
+        print("{:<8} {:<10} {:>12} {:>12}".format(
+            "backend", "operation", "min us/op", "ops/s"))
+        for backend in backends:
+            results = bench_backend(backend, args.sessions, args.repeat)
+            if backend.name == 'redis':
+                results.update(bench_pipeline(client, args.sessions,
+                                              args.repeat))
+            for operation, result in results.items():
+                print("{:<8} {:<10} {:>12.1f} {:>12.0f}".format(
+                    backend.name, operation, result['min_us'],
+                    result['ops_per_sec']))
+            backend.close()
+    finally:
+        os.chdir(cwd)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+""" Benchmark suite of the models and the authentication stack
+
+Measures `Base.save`/`load_from_file`/`search`/`to_json` at each size,
+`BasicAuth.current_user` (with and without the credential cache),
+`SessionAuth`/`SessionExpAuth`/`SessionDBAuth`/`SignedSessionAuth`
+`.current_user` and
+`filter_datum` of 0x00-personal_data, writes the results to a JSON file
+and optionally compares them with a baseline.
+
+Usage (from the project root):
+    $ python3 -m benchmarks.suite [--sizes 1000,10000,100000]
+          [--repeat N] [--output FILE] [--baseline FILE] [--threshold PCT]
+
+Each benchmark keeps the best of `--repeat` rounds (the least disturbed
+by the rest of the host). With `--baseline`, benchmarks slower than the
+baseline by more than `--threshold` percent (default 10) are reported
+as regressions and the exit status is 1.
+"""
+import argparse
+import base64
+import gc
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# fixed costs, so that results only depend on the code and the host
+os.environ.setdefault("PASSWORD_HASHER", "pbkdf2_sha256")
+os.environ.setdefault("PASSWORD_HASH_COST", "10000")
+os.environ.setdefault("SESSION_NAME", "_my_session_id")
+
+from api.v1.auth.basic_auth import BasicAuth  # noqa: E402
+from api.v1.auth.credential_cache import CredentialCache  # noqa: E402
+from api.v1.auth.session_auth import SessionAuth  # noqa: E402
+from api.v1.auth.session_db_auth import SessionDBAuth  # noqa: E402
+from api.v1.auth.session_exp_auth import SessionExpAuth  # noqa: E402
+from api.v1.auth.signed_session_auth import SignedSessionAuth  # noqa: E402
+from benchmarks.search import write_users  # noqa: E402
+from models.base import DATA, STORAGE  # noqa: E402
+from models.storage import JSONFileStorage  # noqa: E402
+from models.user import User  # noqa: E402
+from models.user_session import UserSession  # noqa: E402
+
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+AUTH_USERS = 1000
+FILTERED_LOGGER = os.path.join(os.path.dirname(__file__), "..", "..",
+                               "0x00-personal_data", "filtered_logger.py")
+
+
+class FakeRequest():
+    """ Minimal stand-in of a Flask request for the auth classes
+    """
+
+    def __init__(self, headers: dict = None, cookies: dict = None):
+        """ Initialize a FakeRequest
+        """
+        self.headers = headers or {}
+        self.cookies = cookies or {}
+
+
+def measure(func, ops: int, repeat: int) -> dict:
+    """ Call func() `ops` times per round, for `repeat` rounds,
+    with the garbage collector paused (like timeit), and return the
+    per-call latencies (in microseconds)
+    """
+    rounds = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(ops):
+                func()
+            rounds.append((time.perf_counter() - start) / ops * 1e6)
+    finally:
+        gc.enable()
+    best = min(rounds)
+    return {
+        'ops': ops,
+        'repeat': repeat,
+        'min_us': best,
+        'median_us': statistics.median(rounds),
+        'ops_per_sec': 1e6 / best if best else None,
+    }
+
+
+def bench_models(size: int, repeat: int) -> dict:
+    """ Benchmark Base methods with `size` users in storage
+    """
+    write_users(size)
+    # a fresh storage file of the configured engine (journal: imported)
+    for path in os.listdir("."):
+        if path.startswith(".db_User.") and path != ".db_User.json":
+            os.remove(path)
+    STORAGE.stamps.clear()
+
+    results = {}
+    results['base.load_from_file[{}]'.format(size)] = measure(
+        User.load_from_file, 1, repeat)
+
+    emails = itertools.cycle("user{}@example.com".format(i)
+                             for i in range(0, size, max(1, size // 1000)))
+    results['base.search[{}]'.format(size)] = measure(
+        lambda: User.search({'email': next(emails)}), 10000, repeat)
+
+    users = itertools.cycle(list(DATA['User'].values())[:1000])
+    results['base.to_json[{}]'.format(size)] = measure(
+        lambda: next(users).to_json(True), 10000, repeat)
+
+    results['base.save[{}]'.format(size)] = measure(
+        lambda: next(users).save(), max(1, min(100, 100000 // size)), repeat)
+    return results
+
+
+def make_users(count: int, password: str) -> list:
+    """ Create `count` saved users sharing one password
+    """
+    JSONFileStorage().dump('User', {})
+    for path in os.listdir("."):
+        if path.startswith(".db_User.") and path != ".db_User.json":
+            os.remove(path)
+    STORAGE.stamps.clear()
+    User.load_from_file()
+    hashed = None
+    users = []
+    for i in range(count):
+        user = User(email="auth{}@example.com".format(i))
+        if hashed is None:
+            user.password = password
+            hashed = user.password
+        user._password = hashed
+        DATA['User'][user.id] = user
+        User._index(user)
+        users.append(user)
+    User.save_to_file()
+    return users
+
+
+def bench_auth(repeat: int) -> dict:
+    """ Benchmark current_user of each authentication class
+    """
+    results = {}
+    users = make_users(AUTH_USERS, "benchmark")
+
+    headers = itertools.cycle([{'Authorization': "Basic {}".format(
+        base64.b64encode("{}:benchmark".format(user.email).encode())
+        .decode())} for user in users[:100]])
+    basic_auth = BasicAuth()
+    basic_auth.credential_cache = CredentialCache(1024, 300)
+    results['basic_auth.current_user'] = measure(
+        lambda: basic_auth.current_user(FakeRequest(next(headers))),
+        10000, repeat)
+    basic_auth.credential_cache = CredentialCache(0)
+    results['basic_auth.current_user[no cache]'] = measure(
+        lambda: basic_auth.current_user(FakeRequest(next(headers))),
+        100, repeat)
+
+    session_name = os.environ["SESSION_NAME"]
+    for name, auth_class in (('session_auth', SessionAuth),
+                             ('session_exp_auth', SessionExpAuth),
+                             ('session_db_auth', SessionDBAuth),
+                             ('signed_session_auth', SignedSessionAuth)):
+        SessionAuth.user_id_by_session_id.clear()
+        auth = auth_class()
+        auth.session_duration = 3600
+        if auth_class is SessionDBAuth:
+            sessions = [UserSession(user_id=user.id,
+                                    session_id="session-{}".format(i))
+                        for i, user in enumerate(users)]
+            JSONFileStorage().dump('UserSession', {
+                session.id: session for session in sessions})
+            UserSession.load_from_file()
+            session_ids = [session.session_id for session in sessions]
+        else:
+            session_ids = [auth.create_session(user.id) for user in users]
+        requests = itertools.cycle([FakeRequest(cookies={
+            session_name: session_id}) for session_id in session_ids])
+        results['{}.current_user'.format(name)] = measure(
+            lambda: auth.current_user(next(requests)), 10000, repeat)
+    SessionAuth.user_id_by_session_id.clear()
+    return results
+
+
+def bench_filter_datum(repeat: int) -> dict:
+    """ Benchmark filter_datum of 0x00-personal_data, if importable
+    """
+    spec = importlib.util.spec_from_file_location("filtered_logger",
+                                                  FILTERED_LOGGER)
+    try:
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except (ImportError, OSError) as e:
+        print("filter_datum skipped: {}".format(e), file=sys.stderr)
+        return {}
+
+    fields = list(module.PII_FIELDS)
+    messages = itertools.cycle([
+        "name=user{0};email=user{0}@example.com;phone=555-{0:04d};"
+        "ssn=123-45-{0:04d};password=secret{0};ip=10.0.0.{1};"
+        "last_login=2024-01-01 00:00:00;user_agent=Mozilla/5.0;"
+        .format(i, i % 256) for i in range(100)] + [
+        "ip=10.0.0.1;last_login=2024-01-01 00:00:00;user_agent=curl;"])
+    return {'filter_datum': measure(
+        lambda: module.filter_datum(fields, "***", next(messages), ";"),
+        100000, repeat)}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """ Print the change of each benchmark against the baseline
+    and return the names of the regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print("{:<40} {:>12.2f} us   (new)".format(
+                name, result['min_us']))
+            continue
+        change = (result['min_us'] / base['min_us'] - 1) * 100
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        print("{:<40} {:>12.2f} us  {:>+8.1f}%  {}".format(
+            name, result['min_us'], change, flag))
+    return regressions
+
+
+def main() -> int:
+    """ Run the suite, write the results and compare them
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated numbers of stored users")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline",
+                        help="JSON results of a previous run to compare to")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="regression threshold in percent")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            for size in sizes:
+                results.update(bench_models(size, args.repeat))
+            results.update(bench_auth(args.repeat))
+        finally:
+            os.chdir(cwd)
+    results.update(bench_filter_datum(args.repeat))
+
+    report = {
+        'meta': {
+            'date': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'storage': type(STORAGE).__name__,
+            'password_hasher': os.environ["PASSWORD_HASHER"],
+            'password_hash_cost': os.environ["PASSWORD_HASH_COST"],
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline is None:
+        for name, result in results.items():
+            print("{:<40} {:>12.2f} us".format(name, result['min_us']))
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline['results'], args.threshold)
+    if regressions:
+        print("{} regression(s) above {}%".format(len(regressions),
+                                                   args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
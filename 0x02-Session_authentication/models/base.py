@@ -3,25 +3,62 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
-import json
+from models.object_store import ObjectTable, RWLock
+from models.storage import JSONFileStorage, storage_from_env
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+INDEXES = {}
+INDEXED_VALUES = {}
+LOCKS = {}
+STORAGE = storage_from_env()
+
+
+def _hashable(value) -> bool:
+    """ Check if a value can be used as an index key
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def class_lock(s_class: str) -> RWLock:
+    """ Return the reader-writer lock of a class
+    """
+    lock = LOCKS.get(s_class)
+    if lock is None:
+        lock = LOCKS.setdefault(s_class, RWLock())
+    return lock
 
 
 class Base():
     """ Base class
+
+    Subclasses can declare secondary indexes on attributes:
+      - `unique_indexes`: at most one saved object per value
+      - `indexes`: any number of saved objects per value
+    Indexes reflect attribute values at the last `save()` and are
+    maintained by `save()`, `remove()` and `load_from_file()`.
+
+    The objects, indexes and storage of a class are changed under the
+    class lock held exclusively, and `search` holds it shared: `get`
+    and `count` don't lock, `DATA[<class>]` being replaced as a whole
+    (never emptied then refilled) when reloaded.
     """
 
+    unique_indexes = ()
+    indexes = ()
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
         s_class = str(self.__class__.__name__)
         if DATA.get(s_class) is None:
-            DATA[s_class] = {}
+            DATA.setdefault(s_class, ObjectTable())
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
@@ -59,47 +96,144 @@ class Base():
 
     @classmethod
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from the storage engine
+        """
+        with class_lock(cls.__name__).write():
+            cls._load()
+
+    @classmethod
+    def _load(cls):
+        """ Load all objects, the class lock being held exclusively
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        objs = ObjectTable()
+        for obj_id, obj_json in STORAGE.load(s_class).items():
+            objs[obj_id] = cls(**obj_json)
+        INDEXES[s_class] = {}
+        INDEXED_VALUES[s_class] = {}
+        for obj in objs.values():
+            cls._index(obj, check_unique=False)
+        DATA[s_class] = objs
+
+    @classmethod
+    def refresh_from_file(cls):
+        """ Apply the changes made to the storage since the last load,
+        loading all objects only if they can't be applied incrementally
+        """
+        s_class = cls.__name__
+        with class_lock(s_class).write():
+            changes = STORAGE.changes(s_class)
+            if changes is None:
+                cls._load()
+                return
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+            # replace objects in place: `get()` doesn't lock, so an
+            # updated object must never be missing from the table
+            for obj_id, obj_json in changes:
+                cls._unindex(obj_id)
+                if obj_json is None:
+                    DATA[s_class].pop(obj_id, None)
+                    continue
+                obj = cls(**obj_json)
+                DATA[s_class][obj_id] = obj
+                cls._index(obj, check_unique=False)
 
     @classmethod
     def save_to_file(cls):
-        """ Save all objects to file
+        """ Save all objects to file (`.db_<Class>.json` export)
+        """
+        s_class = cls.__name__
+        with class_lock(s_class).read():
+            JSONFileStorage().dump(s_class, DATA[s_class])
+
+    @classmethod
+    def _indexed_attributes(cls) -> tuple:
+        """ Return all attributes with a secondary index
+        """
+        return tuple(cls.unique_indexes) + tuple(cls.indexes)
+
+    @classmethod
+    def _index(cls, obj: TypeVar('Base'), check_unique: bool = True):
+        """ Add (or refresh) an object in the secondary indexes
+        Raise ValueError if a new or changed value violates a unique
+        index (duplicates already in the loaded data are tolerated)
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        indexes = INDEXES.setdefault(s_class, {})
+        values = {}
+        for attr in cls._indexed_attributes():
+            value = getattr(obj, attr, None)
+            if value is not None and _hashable(value):
+                values[attr] = value
+
+        if check_unique:
+            previous = INDEXED_VALUES.get(s_class, {}).get(obj.id, {})
+            for attr in cls.unique_indexes:
+                if attr not in values or previous.get(attr) == values[attr]:
+                    continue
+                holders = indexes.get(attr, {}).get(values[attr], {})
+                for obj_id in holders:
+                    if obj_id != obj.id:
+                        raise ValueError("{} {} already exists"
+                                         .format(attr, values[attr]))
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+        cls._unindex(obj.id)
+        for attr, value in values.items():
+            indexes.setdefault(attr, {}).setdefault(value, {})[obj.id] = None
+        INDEXED_VALUES.setdefault(s_class, {})[obj.id] = values
+
+    @classmethod
+    def _unindex(cls, obj_id: str):
+        """ Remove an object from the secondary indexes
+        """
+        s_class = cls.__name__
+        values = INDEXED_VALUES.get(s_class, {}).pop(obj_id, None)
+        if values is None:
+            return
+        indexes = INDEXES[s_class]
+        for attr, value in values.items():
+            holders = indexes[attr].get(value)
+            if holders is None:
+                continue
+            holders.pop(obj_id, None)
+            if not holders:
+                del indexes[attr][value]
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        with class_lock(s_class).write():
+            self.__class__._index(self)
+            self.updated_at = datetime.utcnow()
+            DATA[s_class][self.id] = self
+            STORAGE.upsert(s_class, DATA[s_class], self)
+
+    @classmethod
+    def save_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Save several objects of the class with a single storage write
+        """
+        s_class = cls.__name__
+        objs = list(objs)
+        if not objs:
+            return
+        with class_lock(s_class).write():
+            now = datetime.utcnow()
+            for obj in objs:
+                cls._index(obj)
+                obj.updated_at = now
+                DATA[s_class][obj.id] = obj
+            STORAGE.upsert_many(s_class, DATA[s_class], objs)
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with class_lock(s_class).write():
+            if DATA[s_class].get(self.id) is not None:
+                self.__class__._unindex(self.id)
+                del DATA[s_class][self.id]
+                STORAGE.delete(s_class, DATA[s_class], self.id)
 
     @classmethod
     def count(cls) -> int:
@@ -124,6 +258,8 @@ class Base():
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
+        Equality on an indexed attribute is resolved through the index,
+        other attributes are then checked on the candidates only
         """
         s_class = cls.__name__
         def _search(obj):
@@ -133,5 +269,17 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        with class_lock(s_class).read():
+            objs = DATA[s_class]
+            candidates = None
+            indexed = cls._indexed_attributes()
+            for k, v in attributes.items():
+                if k in indexed and v is not None and _hashable(v):
+                    obj_ids = INDEXES.get(s_class, {}).get(k, {}).get(v, {})
+                    candidates = [objs[i] for i in obj_ids if i in objs]
+                    break
+            if candidates is None:
+                candidates = objs.snapshot()
+
+        return list(filter(_search, candidates))
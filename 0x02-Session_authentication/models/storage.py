@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+""" Storage module
+"""
+from contextlib import contextmanager
+from os import getenv, path
+import fcntl
+import json
+import os
+
+
+def file_stamp(file_path: str) -> tuple:
+    """ Return a stamp changing whenever the file is rewritten,
+    None if it doesn't exist
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class JSONFileStorage():
+    """ Store all objects of a class in one `.db_<Class>.json` file,
+    rewritten entirely on every change
+    """
+
+    def __init__(self):
+        """ Initialize a JSONFileStorage
+        """
+        self.stamps = {}
+
+    def file_path(self, s_class: str) -> str:
+        """ Path of the JSON file of a class
+        """
+        return ".db_{}.json".format(s_class)
+
+    def load(self, s_class: str) -> dict:
+        """ Return the JSON dictionaries of all objects, by ID
+        """
+        file_path = self.file_path(s_class)
+        self.stamps[s_class] = file_stamp(file_path)
+        if not path.exists(file_path):
+            return {}
+        with open(file_path, 'r') as f:
+            return json.load(f)
+
+    def changes(self, s_class: str) -> list:
+        """ Return the changes made to the storage since the last load
+        as a list of (ID, JSON dictionary or None if removed),
+        or None if all objects must be loaded again
+        """
+        if s_class not in self.stamps:
+            return None
+        if file_stamp(self.file_path(s_class)) != self.stamps[s_class]:
+            return None
+        return []
+
+    def dump(self, s_class: str, objs: dict):
+        """ Write all objects to the JSON file
+        """
+        objs_json = {}
+        for obj_id, obj in objs.items():
+            objs_json[obj_id] = obj.to_json(True)
+
+        file_path = self.file_path(s_class)
+        with open(file_path, 'w') as f:
+            json.dump(objs_json, f)
+        self.stamps[s_class] = file_stamp(file_path)
+
+    def upsert(self, s_class: str, objs: dict, obj):
+        """ Persist a new or updated object
+        """
+        self.dump(s_class, objs)
+
+    def upsert_many(self, s_class: str, objs: dict, updated: list):
+        """ Persist several new or updated objects at once
+        """
+        self.dump(s_class, objs)
+
+    def delete(self, s_class: str, objs: dict, obj_id: str):
+        """ Persist the removal of an object
+        """
+        self.dump(s_class, objs)
+
+
+class JournalStorage(JSONFileStorage):
+    """ Store objects as a snapshot `.db_<Class>.snapshot.json` plus an
+    append-only journal `.db_<Class>.journal` of upserts and tombstones
+
+    Each change appends one line to the journal; the journal is compacted
+    into a new snapshot once it holds more entries than live objects
+    (and at least `compact_min_entries`), so writes are amortized O(1).
+    An existing `.db_<Class>.json` is imported on first load.
+    Changes appended by other processes are read from the last known
+    journal offset. Processes serialize their appends and compactions
+    with an exclusive lock on `.db_<Class>.lock`; a process that missed
+    entries of others compacts from the files, not from its objects.
+    """
+
+    def __init__(self, compact_min_entries: int = 1000):
+        """ Initialize a JournalStorage
+        """
+        super().__init__()
+        self.compact_min_entries = compact_min_entries
+        self.journal_entries = {}
+        self.offsets = {}
+
+    def snapshot_path(self, s_class: str) -> str:
+        """ Path of the snapshot file of a class
+        """
+        return ".db_{}.snapshot.json".format(s_class)
+
+    def journal_path(self, s_class: str) -> str:
+        """ Path of the journal file of a class
+        """
+        return ".db_{}.journal".format(s_class)
+
+    def lock_path(self, s_class: str) -> str:
+        """ Path of the lock file of a class
+        """
+        return ".db_{}.lock".format(s_class)
+
+    @contextmanager
+    def _locked(self, s_class: str, operation: int = fcntl.LOCK_EX):
+        """ Hold the lock of a class between processes
+        (exclusive, or shared with fcntl.LOCK_SH)
+        """
+        with open(self.lock_path(s_class), 'ab') as f:
+            fcntl.flock(f, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _replay(self, s_class: str) -> tuple:
+        """ Read the snapshot and replay the journal on top of it, and
+        return (JSON dictionaries by ID, journal entries, journal length
+        without a torn last entry, journal size)
+        """
+        objs_json = {}
+        snapshot_path = self.snapshot_path(s_class)
+        if path.exists(snapshot_path):
+            with open(snapshot_path, 'r') as f:
+                objs_json = json.load(f)
+
+        entries = 0
+        data = b""
+        journal_path = self.journal_path(s_class)
+        if path.exists(journal_path):
+            with open(journal_path, 'rb') as f:
+                data = f.read()
+        lines = data.split(b"\n")
+        for line in lines[:-1]:
+            entry = self._parse(line)
+            if entry is None:
+                continue
+            self._apply(objs_json, entry)
+            entries += 1
+        return objs_json, entries, len(data) - len(lines[-1]), len(data)
+
+    def load(self, s_class: str) -> dict:
+        """ Return the JSON dictionaries of all objects, by ID,
+        by replaying the journal on top of the snapshot
+        """
+        snapshot_path = self.snapshot_path(s_class)
+        journal_path = self.journal_path(s_class)
+        with self._locked(s_class):
+            if not path.exists(snapshot_path) \
+                    and not path.exists(journal_path):
+                objs_json = super().load(s_class)
+                if objs_json:
+                    self._write_snapshot(s_class, objs_json)
+                self.stamps[s_class] = file_stamp(snapshot_path)
+                self.journal_entries[s_class] = 0
+                self.offsets[s_class] = 0
+                return objs_json
+
+            self.stamps[s_class] = file_stamp(snapshot_path)
+            objs_json, entries, offset, size = self._replay(s_class)
+            if offset < size:
+                # drop a torn last entry so the next append starts clean
+                with open(journal_path, 'rb+') as f:
+                    f.truncate(offset)
+        self.journal_entries[s_class] = entries
+        self.offsets[s_class] = offset
+        return objs_json
+
+    def changes(self, s_class: str) -> list:
+        """ Return the journal entries appended since the last read
+        as a list of (ID, JSON dictionary or None if removed),
+        or None if the snapshot was compacted in between
+        """
+        if s_class not in self.offsets:
+            return None
+        if file_stamp(self.snapshot_path(s_class)) != self.stamps[s_class]:
+            return None
+        journal_stamp = file_stamp(self.journal_path(s_class))
+        offset = self.offsets[s_class]
+        size = journal_stamp[2] if journal_stamp is not None else 0
+        if size < offset:
+            return None
+        if size == offset:
+            return []
+
+        with self._locked(s_class, fcntl.LOCK_SH):
+            if file_stamp(self.snapshot_path(s_class)) \
+                    != self.stamps[s_class]:
+                return None
+            with open(self.journal_path(s_class), 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        lines = data.split(b"\n")
+        changes = []
+        for line in lines[:-1]:
+            entry = self._parse(line)
+            if entry is None:
+                continue
+            changes.append((entry['id'], entry.get('obj')))
+            self.journal_entries[s_class] = \
+                self.journal_entries.get(s_class, 0) + 1
+        self.offsets[s_class] = offset + len(data) - len(lines[-1])
+        return changes
+
+    def upsert(self, s_class: str, objs: dict, obj):
+        """ Append an upsert of the object to the journal
+        """
+        self._append(s_class, objs, {
+            'op': 'put', 'id': obj.id, 'obj': obj.to_json(True)})
+
+    def upsert_many(self, s_class: str, objs: dict, updated: list):
+        """ Append upserts of several objects to the journal in one write
+        """
+        self._append(s_class, objs, *[
+            {'op': 'put', 'id': obj.id, 'obj': obj.to_json(True)}
+            for obj in updated])
+
+    def delete(self, s_class: str, objs: dict, obj_id: str):
+        """ Append a tombstone of the object to the journal
+        """
+        self._append(s_class, objs, {'op': 'del', 'id': obj_id})
+
+    def compact(self, s_class: str, objs: dict):
+        """ Write all objects to a new snapshot and truncate the journal
+        """
+        with self._locked(s_class):
+            self._compact(s_class, objs)
+
+    def _compact(self, s_class: str, objs: dict = None):
+        """ Compact the journal, the lock being held: from objs if they
+        are up to date with the journal, else from the files (and the
+        next changes() then asks for a full load)
+        """
+        if objs is not None:
+            objs_json = {}
+            for obj_id, obj in objs.items():
+                objs_json[obj_id] = obj.to_json(True)
+        else:
+            objs_json = self._replay(s_class)[0]
+        self._write_snapshot(s_class, objs_json)
+        with open(self.journal_path(s_class), 'w'):
+            pass
+        self.journal_entries[s_class] = 0
+        if objs is not None:
+            self.stamps[s_class] = file_stamp(self.snapshot_path(s_class))
+            self.offsets[s_class] = 0
+        else:
+            self.offsets.pop(s_class, None)
+
+    def _append(self, s_class: str, objs: dict, *entries: dict):
+        """ Append entries to the journal, compacting it if needed
+        """
+        if not entries:
+            return
+        data = "".join(json.dumps(entry) + "\n"
+                       for entry in entries).encode()
+        with self._locked(s_class):
+            with open(self.journal_path(s_class), 'ab') as f:
+                start = f.tell()
+                f.write(data)
+            up_to_date = (
+                self.offsets.get(s_class) == start
+                and self.stamps.get(s_class)
+                == file_stamp(self.snapshot_path(s_class)))
+            if up_to_date:
+                # nothing was appended or compacted by others since
+                # the last read
+                self.offsets[s_class] = start + len(data)
+            count = self.journal_entries.get(s_class, 0) + len(entries)
+            self.journal_entries[s_class] = count
+            if count > max(self.compact_min_entries, len(objs)):
+                self._compact(s_class, objs if up_to_date else None)
+
+    def _write_snapshot(self, s_class: str, objs_json: dict):
+        """ Atomically replace the snapshot file
+        """
+        snapshot_path = self.snapshot_path(s_class)
+        tmp_path = "{}.tmp".format(snapshot_path)
+        with open(tmp_path, 'w') as f:
+            json.dump(objs_json, f)
+        os.replace(tmp_path, snapshot_path)
+
+    @staticmethod
+    def _parse(line: bytes) -> dict:
+        """ Parse a journal line, None if it is empty or corrupted
+        """
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _apply(objs_json: dict, entry: dict):
+        """ Apply a journal entry to JSON dictionaries by ID
+        """
+        if entry.get('op') == 'put':
+            objs_json[entry['id']] = entry['obj']
+        elif entry.get('op') == 'del':
+            objs_json.pop(entry['id'], None)
+
+
+def storage_from_env() -> JSONFileStorage:
+    """ Return the storage engine selected by MODELS_STORAGE
+    (`json`, the default, or `journal`)
+    """
+    if getenv("MODELS_STORAGE") == "journal":
+        compact_min_entries = getenv("MODELS_JOURNAL_COMPACT_MIN", "1000")
+        return JournalStorage(int(compact_min_entries))
+    return JSONFileStorage()
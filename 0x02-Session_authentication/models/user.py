@@ -1,14 +1,16 @@
 #!/usr/bin/env python3
 """ User module
 """
-import hashlib
 from models.base import Base
+from models.hashers import check_password, make_password, needs_rehash
 
 
 class User(Base):
     """ User class
     """
 
+    unique_indexes = ('email',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -26,22 +28,34 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: hash with the default hasher
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            self._password = make_password(pwd)
 
     def is_valid_password(self, pwd: str) -> bool:
         """ Validate a password
+        An outdated hash is upgraded to the default hasher on success
         """
         if pwd is None or type(pwd) is not str:
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+        if not check_password(pwd, self.password):
+            return False
+        if needs_rehash(self.password):
+            hashed = self.password
+            self.password = pwd
+            if User.get(self.id) is self:
+                try:
+                    self.save()
+                except OSError:
+                    # storage write failed, but the login succeeded:
+                    # keep the old hash
+                    self._password = hashed
+        return True
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
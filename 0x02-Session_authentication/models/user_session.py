@@ -3,7 +3,8 @@
 This module contains the UserSession class,
 which represents a user session.
 """
-from models.base import Base
+from datetime import datetime
+from models.base import Base, TIMESTAMP_FORMAT
 
 
 class UserSession(Base):
@@ -11,6 +12,9 @@ class UserSession(Base):
     Represents a user session.
     """
 
+    unique_indexes = ('session_id',)
+    indexes = ('user_id',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """
         Initializes a new instance of the UserSession class.
@@ -19,3 +23,8 @@ class UserSession(Base):
         super().__init__(*args, **kwargs)
         self.user_id = kwargs.get('user_id')
         self.session_id = kwargs.get('session_id')
+        last_seen_at = kwargs.get('last_seen_at')
+        if isinstance(last_seen_at, str):
+            last_seen_at = datetime.strptime(last_seen_at, TIMESTAMP_FORMAT)
+        self.last_seen_at = last_seen_at
+        self.expires_at = kwargs.get('expires_at')
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+""" Threads saving, removing and reloading models at the same time
+(a short run of the invariants of benchmarks.concurrency, which is
+the heavy version)
+"""
+import os
+import random
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+os.environ.setdefault("PASSWORD_HASH_COST", "1000")
+
+from models import base  # noqa: E402
+from models.storage import JournalStorage, JSONFileStorage  # noqa: E402
+from models.user import User  # noqa: E402
+
+THREADS = 4
+OPS = 150
+
+
+def worker(index: int, owned: list, errors: list,
+           barrier: threading.Barrier):
+    """ Create, change, remove and look up the users of the thread,
+    refreshing the class from storage now and then
+    """
+    rand = random.Random(index)
+    barrier.wait()
+    try:
+        for i in range(OPS):
+            draw = rand.random()
+            if draw < 0.2 or not owned:
+                user = User(email="t{}-{}@example.com".format(index, i))
+                user.save()
+                owned.append(user)
+            elif draw < 0.45:
+                user = rand.choice(owned)
+                user.email = "t{}-{}@example.com".format(index, i)
+                user.save()
+            elif draw < 0.55:
+                user = owned.pop(rand.randrange(len(owned)))
+                user.remove()
+                if User.get(user.id) is not None:
+                    errors.append("removed user still found")
+            elif draw < 0.65:
+                User.refresh_from_file()
+            else:
+                user = rand.choice(owned)
+                if User.get(user.id) is None:
+                    errors.append("get missed an object")
+                found = User.search({'email': user.email})
+                if [obj.id for obj in found] != [user.id]:
+                    errors.append("search by {} returned {} objects"
+                                  .format(user.email, len(found)))
+    except Exception as e:
+        errors.append("{}: {}".format(type(e).__name__, e))
+
+
+class ConcurrencyTests():
+    """ Checks run against each storage engine (mixed into TestCase
+    classes that define storage())
+    """
+
+    def setUp(self):
+        """ Start from an empty storage directory
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        patcher = mock.patch.object(base, 'STORAGE', self.storage())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        User.load_from_file()
+
+    def test_threads(self):
+        """ Memory, indexes and storage agree after concurrent changes
+        """
+        owned = [[] for _ in range(THREADS)]
+        errors = []
+        barrier = threading.Barrier(THREADS)
+        threads = [threading.Thread(target=worker,
+                                    args=(i, owned[i], errors, barrier))
+                   for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        expected = {user.id: user.email
+                    for users in owned for user in users}
+        objs = User.all()
+        self.assertEqual(len(objs), len({obj.id for obj in objs}))
+        self.assertEqual({obj.id: obj.email for obj in objs}, expected)
+        self.assertEqual(User.count(), len(expected))
+
+        for obj_id, email in expected.items():
+            found = User.search({'email': email})
+            self.assertEqual([obj.id for obj in found], [obj_id])
+        indexed = base.INDEXES['User']['email']
+        self.assertEqual({email: list(holders)
+                          for email, holders in indexed.items()},
+                         {email: [obj_id]
+                          for obj_id, email in expected.items()})
+
+        User.load_from_file()
+        self.assertEqual({obj.id: obj.email for obj in User.all()},
+                         expected)
+
+
+class TestJSONFileStorage(ConcurrencyTests, unittest.TestCase):
+    """ With the JSON file storage
+    """
+
+    def storage(self) -> JSONFileStorage:
+        """ Return the storage engine
+        """
+        return JSONFileStorage()
+
+
+class TestJournalStorage(ConcurrencyTests, unittest.TestCase):
+    """ With the journal storage, compacting often
+    """
+
+    def storage(self) -> JournalStorage:
+        """ Return the storage engine
+        """
+        return JournalStorage(50)
+
+
+if __name__ == "__main__":
+    unittest.main()
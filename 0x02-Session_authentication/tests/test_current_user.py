@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+""" Test that the current user is resolved once per request
+
+Run from the project root:
+    $ python3 -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+os.environ["AUTH_TYPE"] = "session_db_auth"
+os.environ["SESSION_NAME"] = "_my_session_id"
+os.environ.setdefault("PASSWORD_HASH_COST", "1000")
+
+from api.v1.app import app  # noqa: E402
+from api.v1.auth.context import current_user  # noqa: E402
+from flask import jsonify, request  # noqa: E402
+from models.user import User  # noqa: E402
+from models.user_session import UserSession  # noqa: E402
+
+
+def resolve_current_user():
+    """ Resolve the current user through every entry point, repeatedly
+    """
+    from api.v1.app import auth
+    users = [current_user(), current_user(auth), request.current_user,
+             current_user()]
+    return jsonify({"ids": [user.id for user in users]})
+
+
+class TestCurrentUser(unittest.TestCase):
+    """ Storage lookups of the current user per request
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """ Create a user in a temporary folder and log in
+        """
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.mkdtemp()
+        os.chdir(cls.tmp)
+        app.add_url_rule("/api/v1/test/current_user", "resolve_current_user",
+                         resolve_current_user)
+        user = User(email="bob@example.com")
+        user.password = "pwd"
+        user.save()
+        cls.user = user
+        cls.client = app.test_client()
+        response = cls.client.post("/api/v1/auth_session/login",
+                                   data={"email": "bob@example.com",
+                                         "password": "pwd"})
+        assert response.status_code == 200
+
+    @classmethod
+    def tearDownClass(cls):
+        """ Remove the temporary folder
+        """
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.tmp)
+
+    def setUp(self):
+        """ Count the calls of the storage lookups
+        """
+        self.calls = {}
+        for owner, name in ((User, 'get'), (UserSession, 'search'),
+                            (UserSession, 'refresh_from_file')):
+            original = getattr(owner, name)
+            if name in owner.__dict__:
+                self.addCleanup(setattr, owner, name, owner.__dict__[name])
+            else:
+                self.addCleanup(delattr, owner, name)
+            setattr(owner, name, classmethod(self._counted(
+                "{}.{}".format(owner.__name__, name), original)))
+
+    def _counted(self, key, original):
+        """ Return a classmethod body calling original and counting it
+        """
+        def counted(cls, *args, **kwargs):
+            self.calls[key] = self.calls.get(key, 0) + 1
+            return original(*args, **kwargs)
+        return counted
+
+    def test_one_lookup_per_request(self):
+        """ Several calls in one request do a single lookup of each kind
+        """
+        for _ in range(2):
+            self.calls.clear()
+            response = self.client.get("/api/v1/test/current_user")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json["ids"], [self.user.id] * 4)
+            self.assertEqual(self.calls, {
+                "User.get": 1,
+                "UserSession.search": 1,
+                "UserSession.refresh_from_file": 1,
+            })
+
+    def test_users_me(self):
+        """ GET /users/me resolves the user once, in filter_requests
+        """
+        response = self.client.get("/api/v1/users/me")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.calls["User.get"], 1)
+        self.assertEqual(self.calls["UserSession.search"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
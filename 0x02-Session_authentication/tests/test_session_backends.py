@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+""" Tests of the session backends and of RedisClient, the Redis ones
+against the in-process fake server of benchmarks.fake_redis
+"""
+import io
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+os.environ.setdefault("PASSWORD_HASH_COST", "1000")
+
+from api.v1.auth.redis_client import RedisClient, RedisError  # noqa: E402
+from api.v1.auth.session_backends import FileBackend  # noqa: E402
+from api.v1.auth.session_backends import MemoryBackend  # noqa: E402
+from api.v1.auth.session_backends import RedisBackend  # noqa: E402
+from api.v1.auth.session_backends import SQLiteBackend  # noqa: E402
+from benchmarks.fake_redis import FakeRedisServer  # noqa: E402
+from models.user_session import UserSession  # noqa: E402
+
+
+class FakeRedisTestCase(unittest.TestCase):
+    """ Runs a fake Redis server for the tests of the class, emptied
+    before each test
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """ Start the server
+        """
+        cls.server = FakeRedisServer().start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        """ Empty the server
+        """
+        self.server.redis.data.clear()
+
+
+class BackendTests():
+    """ Checks run against every backend (mixed into TestCase classes
+    that set self.backend)
+    """
+
+    def test_create_get(self):
+        """ A session is found with its user ID and creation time
+        """
+        self.backend.create("s1", "user-1", 1700000000.0, 60)
+        session = self.backend.get("s1")
+        self.assertEqual(session['user_id'], "user-1")
+        self.assertAlmostEqual(session['created_at'], 1700000000.0, 3)
+
+    def test_get_missing(self):
+        """ An unknown session is None
+        """
+        self.assertIsNone(self.backend.get("missing"))
+        self.assertIsNone(self.backend.get("missing", 60))
+
+    def test_no_expiry(self):
+        """ A session without time to live stays
+        """
+        self.backend.create("s1", "user-1", time.time())
+        time.sleep(0.05)
+        self.assertEqual(self.backend.get("s1")['user_id'], "user-1")
+
+    def test_expiry(self):
+        """ A session is gone after its time to live
+        """
+        self.backend.create("s1", "user-1", time.time(), 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.backend.get("s1"))
+
+    def test_touch(self):
+        """ A lookup with touch_ttl pushes back the expiry
+        """
+        self.backend.create("s1", "user-1", time.time(), 0.2)
+        self.assertIsNotNone(self.backend.get("s1", 60))
+        time.sleep(0.3)
+        self.assertEqual(self.backend.get("s1")['user_id'], "user-1")
+
+    def test_delete(self):
+        """ A deleted session is gone, deleting it again is False
+        """
+        self.backend.create("s1", "user-1", time.time(), 60)
+        self.backend.create("s2", "user-2", time.time(), 60)
+        self.assertTrue(self.backend.delete("s1"))
+        self.assertFalse(self.backend.delete("s1"))
+        self.assertIsNone(self.backend.get("s1"))
+        self.assertEqual(self.backend.get("s2")['user_id'], "user-2")
+
+
+class TestMemoryBackend(BackendTests, unittest.TestCase):
+    """ MemoryBackend
+    """
+
+    def setUp(self):
+        """ Use a new in-memory store
+        """
+        self.backend = MemoryBackend()
+        self.addCleanup(self.backend.close)
+
+
+class TestFileBackend(BackendTests, unittest.TestCase):
+    """ FileBackend
+    """
+
+    def setUp(self):
+        """ Use an empty storage directory
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        UserSession.load_from_file()
+        self.backend = FileBackend()
+        self.addCleanup(self.backend.close)
+
+
+class TestSQLiteBackend(BackendTests, unittest.TestCase):
+    """ SQLiteBackend
+    """
+
+    def setUp(self):
+        """ Use a new database
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.backend = SQLiteBackend(os.path.join(tmp.name, "sessions.db"))
+        self.addCleanup(self.backend.close)
+
+    def test_purge(self):
+        """ Expired rows are deleted every purge_every writes
+        """
+        self.backend.purge_every = 2
+        self.backend.create("s1", "user-1", time.time(), 0.01)
+        time.sleep(0.05)
+        self.backend.create("s2", "user-2", time.time(), 60)
+        count = self.backend._connection().execute(
+            "SELECT COUNT(*) FROM sessions").fetchone()[0]
+        self.assertEqual(count, 1)
+
+
+class TestRedisBackend(BackendTests, FakeRedisTestCase):
+    """ RedisBackend against the fake server
+    """
+
+    def setUp(self):
+        """ Connect to the fake server
+        """
+        super().setUp()
+        self.backend = RedisBackend(RedisClient.from_url(self.server.url))
+        self.addCleanup(self.backend.close)
+
+    def test_keys(self):
+        """ Sessions are `session:<ID>` keys expired by the server
+        """
+        self.backend.create("s1", "user-1", time.time(), 60)
+        client = self.backend.client
+        self.assertEqual(client.execute('EXISTS', 'session:s1'), 1)
+        self.assertGreater(client.execute('PTTL', 'session:s1'), 59000)
+        self.backend.get("s1", 120)
+        self.assertGreater(client.execute('PTTL', 'session:s1'), 119000)
+
+
+class TestRedisClient(FakeRedisTestCase):
+    """ RedisClient
+    """
+
+    def setUp(self):
+        """ Connect to the fake server
+        """
+        super().setUp()
+        self.client = RedisClient.from_url(self.server.url)
+        self.addCleanup(self.client.close)
+
+    def test_from_url(self):
+        """ Host, port, password and database are read from the URL
+        """
+        client = RedisClient.from_url("redis://:secret@example.com:6380/2")
+        self.assertEqual((client.host, client.port, client.password,
+                          client.db), ("example.com", 6380, "secret", 2))
+        client = RedisClient.from_url("redis://")
+        self.assertEqual((client.host, client.port, client.password,
+                          client.db), ("localhost", 6379, None, 0))
+
+    def test_commands(self):
+        """ Replies are decoded by type
+        """
+        self.assertEqual(self.client.execute('PING'), "PONG")
+        self.assertEqual(self.client.execute('SET', 'key', 'value'), "OK")
+        self.assertEqual(self.client.execute('GET', 'key'), b"value")
+        self.assertIsNone(self.client.execute('GET', 'missing'))
+        self.assertEqual(self.client.execute('DEL', 'key', 'missing'), 1)
+
+    def test_pipeline(self):
+        """ Replies of a pipeline come back in order on one connection
+        """
+        replies = self.client.pipeline([('SET', 'a', 1), ('SET', 'b', 2),
+                                        ('GET', 'a'), ('GET', 'b'),
+                                        ('DBSIZE',)])
+        self.assertEqual(replies, ["OK", "OK", b"1", b"2", 2])
+        self.assertEqual(self.client.pipeline([]), [])
+        self.assertEqual(self.client._pool.qsize(), 1)
+
+    def test_password_and_db(self):
+        """ AUTH and SELECT are sent on connect
+        """
+        client = RedisClient.from_url(self.server.url.replace(
+            "redis://", "redis://:secret@")[:-1] + "3")
+        self.addCleanup(client.close)
+        self.assertEqual(client.execute('PING'), "PONG")
+
+    def test_error_reply(self):
+        """ An error reply raises RedisError, the connection is reused
+        """
+        with self.assertRaises(RedisError):
+            self.client.execute('NOSUCHCOMMAND')
+        with self.assertRaises(RedisError):
+            self.client.pipeline([('SET', 'a', 1), ('NOSUCHCOMMAND',)])
+        self.assertEqual(self.client._pool.qsize(), 1)
+        self.assertEqual(self.client.execute('GET', 'a'), b"1")
+
+    def test_closed_connection(self):
+        """ A connection closed by the server is dropped, not reused
+        """
+        self.assertEqual(self.client.execute('QUIT'), "OK")
+        with self.assertRaises(ConnectionError):
+            self.client.execute('PING')
+        self.assertEqual(self.client._pool.qsize(), 0)
+        self.assertEqual(self.client.execute('PING'), "PONG")
+
+    def test_server_down(self):
+        """ Connecting to a port without a server raises OSError
+        """
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        client = RedisClient("127.0.0.1", port, timeout=1)
+        with self.assertRaises(OSError):
+            client.execute('PING')
+
+    def test_read_reply(self):
+        """ RESP2 replies are parsed, truncated ones are errors
+        """
+        def read(data: bytes):
+            return RedisClient._read_reply(io.BytesIO(data))
+
+        self.assertEqual(read(b"+OK\r\n"), "OK")
+        self.assertEqual(read(b":-3\r\n"), -3)
+        self.assertEqual(read(b"$5\r\nhe\r\no\r\n"), b"he\r\no")
+        self.assertEqual(read(b"$0\r\n\r\n"), b"")
+        self.assertIsNone(read(b"$-1\r\n"))
+        self.assertIsNone(read(b"*-1\r\n"))
+        self.assertEqual(read(b"*3\r\n:1\r\n$1\r\na\r\n*1\r\n+b\r\n"),
+                         [1, b"a", ["b"]])
+        error = read(b"-ERR wrong\r\n")
+        self.assertIsInstance(error, RedisError)
+        self.assertEqual(str(error), "ERR wrong")
+        with self.assertRaises(RedisError):
+            read(b"?what\r\n")
+        for truncated in (b"", b"+OK", b"$5\r\nhe", b"*2\r\n:1\r\n"):
+            with self.assertRaises(ConnectionError):
+                read(truncated)
+
+
+if __name__ == "__main__":
+    unittest.main()
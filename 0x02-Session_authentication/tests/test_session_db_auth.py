@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+""" Tests of SessionDBAuth
+"""
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ.setdefault("PASSWORD_HASH_COST", "1000")
+
+from api.v1.auth.session_db_auth import SessionDBAuth  # noqa: E402
+from models.user_session import UserSession  # noqa: E402
+
+
+class TestSessionDBAuth(unittest.TestCase):
+    """ SessionDBAuth keeps its sessions in the database only
+    """
+
+    def setUp(self):
+        """ Run in an empty storage directory
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        UserSession.load_from_file()
+
+    @mock.patch.dict(os.environ, {"SESSION_MAX_SESSIONS": "2",
+                                  "SESSION_EVICTION": "reject",
+                                  "SESSION_DURATION": "60"})
+    def test_no_in_memory_cap(self):
+        """ Logins are not refused by the in-memory session cap
+        """
+        auth = SessionDBAuth()
+        session_ids = [auth.create_session("user-{}".format(i))
+                       for i in range(5)]
+        self.assertNotIn(None, session_ids)
+        self.assertEqual(auth.user_id_by_session_id, {})
+        for i, session_id in enumerate(session_ids):
+            self.assertEqual(auth.user_id_for_session_id(session_id),
+                             "user-{}".format(i))
+        self.assertEqual(UserSession.count(), 5)
+
+    def test_invalid_user_id(self):
+        """ No session without a user ID
+        """
+        auth = SessionDBAuth()
+        self.assertIsNone(auth.create_session(None))
+        self.assertIsNone(auth.create_session(42))
+        self.assertEqual(UserSession.count(), 0)
+
+    def _idle_session(self, auth: SessionDBAuth) -> UserSession:
+        """ Create a session last seen 50 seconds ago, due for a touch
+        """
+        session_id = auth.create_session("user-0")
+        session = UserSession.search({'session_id': session_id})[0]
+        session.last_seen_at = datetime.utcnow() - timedelta(seconds=50)
+        session.save()
+        self.assertEqual(auth.user_id_for_session_id(session_id), "user-0")
+        self.assertIn(session.id, auth._pending_touches)
+        return session
+
+    @mock.patch.dict(os.environ, {"SESSION_IDLE_TIMEOUT": "60",
+                                  "SESSION_TOUCH_INTERVAL": "30"})
+    def test_close_writes_touches(self):
+        """ Queued last-seen updates are written on close (at exit)
+        """
+        auth = SessionDBAuth()
+        self.addCleanup(auth.close)
+        session = self._idle_session(auth)
+        auth.close()
+        UserSession.load_from_file()
+        self.assertLess(datetime.utcnow() - UserSession.get(
+            session.id).last_seen_at, timedelta(seconds=5))
+
+    @mock.patch.dict(os.environ, {"SESSION_IDLE_TIMEOUT": "60",
+                                  "SESSION_TOUCH_INTERVAL": "1"})
+    def test_flusher_writes_touches(self):
+        """ The flusher thread writes queued updates without requests
+        """
+        auth = SessionDBAuth()
+        self.addCleanup(auth.close)
+        self._idle_session(auth)
+        deadline = time.monotonic() + 5
+        while auth._pending_touches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(auth._pending_touches, {})
+
+    @mock.patch.dict(os.environ, {"SESSION_IDLE_TIMEOUT": "60",
+                                  "SESSION_TOUCH_INTERVAL": "30"})
+    def test_reload_keeps_pending_touch(self):
+        """ A reload before the flush doesn't make the session look idle
+        """
+        auth = SessionDBAuth()
+        self.addCleanup(auth.close)
+        session = self._idle_session(auth)
+        UserSession.load_from_file()
+        auth.idle_timeout = 40
+        self.assertEqual(auth.user_id_for_session_id(session.session_id),
+                         "user-0")
+
+
+if __name__ == "__main__":
+    unittest.main()
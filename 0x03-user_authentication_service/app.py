@@ -7,11 +7,30 @@ that serves as a user authentication service.
 from flask import Flask, jsonify, request, abort, make_response
 from flask import url_for, redirect
 from auth import Auth
+from hashing_service import HashingBusyError
 
 app = Flask(__name__)
 AUTH = Auth()
 
 
+@app.errorhandler(HashingBusyError)
+def hashing_busy(error):
+    """
+    Ask the client to retry later when the password hashing queue is full.
+    """
+
+    return jsonify({"message": "service busy"}), 503
+
+
+@app.teardown_appcontext
+def teardown_db(exception=None):
+    """
+    Release the database session of the request.
+    """
+
+    AUTH.teardown()
+
+
 @app.route("/")
 def welcome():
     """
@@ -49,7 +68,8 @@ def login():
     if not AUTH.valid_login(email, password):
         abort(401)
 
-    session_id = AUTH.create_session(email)
+    session_id = AUTH.create_session(email,
+                                     request.headers.get('User-Agent'))
 
     response = make_response(
         jsonify({"email": email, "message": "logged in"})
@@ -71,7 +91,7 @@ def logout():
     if not user:
         abort(403)
 
-    AUTH.destroy_session(user.id)
+    AUTH.destroy_session(user.id, session_id)
     return redirect(url_for('welcome'))
 
 
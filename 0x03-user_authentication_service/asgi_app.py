@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+This module contains the ASGI (Quart) variant of the user authentication
+service: same routes as app.py, with asynchronous database access and
+bcrypt off the event loop.
+
+Run it with an ASGI server, e.g.:
+    hypercorn asgi_app:app --bind 0.0.0.0:5000 --keep-alive 75
+"""
+
+from quart import Quart, jsonify, request, abort, make_response
+from quart import url_for, redirect
+from async_auth import AsyncAuth
+from hashing_service import HashingBusyError
+
+app = Quart(__name__)
+AUTH = AsyncAuth()
+
+
+@app.before_serving
+async def startup():
+    """
+    Prepare the database before accepting connections.
+    """
+
+    await AUTH.init()
+
+
+@app.after_serving
+async def shutdown():
+    """
+    Close the database connections.
+    """
+
+    await AUTH.close()
+
+
+@app.errorhandler(HashingBusyError)
+async def hashing_busy(error):
+    """
+    Ask the client to retry later when the password hashing queue is full.
+    """
+
+    return jsonify({"message": "service busy"}), 503
+
+
+@app.route("/")
+async def welcome():
+    """
+    Endpoint that returns a welcome message.
+    """
+
+    return jsonify({"message": "Bienvenue"})
+
+
+@app.route("/users", methods=["POST"], strict_slashes=False)
+async def users():
+    """
+    Register a new user.
+    """
+
+    form = await request.form
+    email = form['email']
+    password = form['password']
+
+    try:
+        user = await AUTH.register_user(email, password)
+        return jsonify({"email": user.email, "message": "user created"}), 200
+    except ValueError:
+        return jsonify({"message": "email already registered"}), 400
+
+
+@app.route("/sessions", methods=["POST"], strict_slashes=False)
+async def login():
+    """
+    Handle user login.
+    """
+
+    form = await request.form
+    email = form['email']
+    password = form['password']
+
+    if not await AUTH.valid_login(email, password):
+        abort(401)
+
+    session_id = await AUTH.create_session(email,
+                                           request.headers.get('User-Agent'))
+
+    response = await make_response(
+        jsonify({"email": email, "message": "logged in"})
+        )
+    response.set_cookie('session_id', session_id)
+
+    return response
+
+
+@app.route("/sessions", methods=["DELETE"], strict_slashes=False)
+async def logout():
+    """
+    Handle user logout.
+    """
+
+    session_id = request.cookies.get('session_id', None)
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if not user:
+        abort(403)
+
+    await AUTH.destroy_session(user.id, session_id)
+    return redirect(url_for('welcome'))
+
+
+@app.route("/profile", strict_slashes=False)
+async def profile():
+    """
+    Retrieves the user's profile information.
+    """
+
+    session_id = request.cookies.get('session_id', None)
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if not user:
+        abort(403)
+
+    return jsonify({"email": user.email}), 200
+
+
+@app.route("/reset_password", methods=["POST"], strict_slashes=False)
+async def get_reset_password_token():
+    """
+    Get the reset password token for a user.
+    """
+
+    form = await request.form
+    email = form['email']
+    try:
+        reset_token = await AUTH.get_reset_password_token(email)
+        return jsonify({"email": email, "reset_token": reset_token}), 200
+    except ValueError:
+        abort(403)
+
+
+@app.route("/reset_password", methods=["PUT"], strict_slashes=False)
+async def update_password():
+    """
+    Update the password for a user using a reset token.
+    """
+
+    form = await request.form
+    email = form['email']
+    reset_token = form['reset_token']
+    new_password = form['new_password']
+
+    try:
+        await AUTH.update_password(reset_token, new_password)
+        return jsonify({"email": email, "message": "Password updated"}), 200
+    except ValueError:
+        abort(403)
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5000)
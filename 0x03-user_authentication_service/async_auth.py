@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+This module provides coroutines for user authentication,
+the asyncio counterpart of auth.py.
+"""
+import hashlib
+import os
+from sqlalchemy.orm.exc import NoResultFound
+from async_db import AsyncDB
+from auth import _generate_uuid
+from hashing_service import get_hashing_service
+from user import User
+from user_session import UserSession
+from typing import List, Union
+
+
+class AsyncAuth:
+    """
+    AsyncAuth class to interact with the authentication database
+    without blocking the event loop: queries go through AsyncDB and
+    bcrypt runs on the hashing service pool.
+    """
+
+    def __init__(self):
+        self._db = AsyncDB()
+
+    async def init(self) -> None:
+        """
+        Prepare the database.
+        """
+
+        await self._db.init()
+
+    async def close(self) -> None:
+        """
+        Close the database connections.
+        """
+
+        await self._db.close()
+
+    async def register_user(self, email: str, password: str) -> User:
+        """
+        Register a new user.
+        """
+
+        hashed_password = await get_hashing_service().hash_password_async(
+            password)
+        return await self._db.add_user(email, hashed_password)
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """
+        Check if the provided email and password combination is valid.
+        """
+
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return False
+        return await get_hashing_service().check_password_async(
+            password, user.hashed_password)
+
+    async def create_session(self, email: str,
+                             user_agent: str = None) -> str:
+        """
+        Create a session for the user with the given email.
+        """
+
+        session_id = _generate_uuid()
+        user_agent_hash = None
+        if user_agent:
+            user_agent_hash = hashlib.sha256(user_agent.encode()).hexdigest()
+        if not await self._db.add_session_for_email(email, session_id,
+                                                    user_agent_hash):
+            return None
+
+        return session_id
+
+    async def get_user_from_session_id(
+            self, session_id: str) -> Union[User, None]:
+        """
+        Retrieve a user object based on the provided session ID.
+        """
+
+        if not session_id:
+            return None
+
+        try:
+            return await self._db.find_user_by_session_id(
+                session_id,
+                int(os.getenv('SESSION_TOUCH_INTERVAL', '60')))
+        except NoResultFound:
+            return None
+
+    async def destroy_session(self, user_id: int,
+                              session_id: str = None) -> None:
+        """
+        Destroy the given session of the user,
+        or all of the user's sessions if no session ID is given.
+        """
+
+        if session_id is None:
+            await self._db.delete_user_sessions(user_id)
+        else:
+            await self._db.delete_session(session_id, user_id)
+
+    async def list_sessions(self, user_id: int) -> List[UserSession]:
+        """
+        List the sessions of the given user.
+        """
+
+        return await self._db.list_sessions(user_id)
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """
+        Retrieves a reset password token for the user with the given email.
+        """
+
+        reset_token = _generate_uuid()
+        if not await self._db.update_user_by({'email': email},
+                                             reset_token=reset_token):
+            raise ValueError(f"No user found with the email {email}")
+        return reset_token
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """
+        Update the password for a user using a reset token.
+        """
+
+        if not reset_token:
+            raise ValueError("No user found with the provided reset token")
+
+        # check the token before paying for a hash: bogus tokens must
+        # not take hashing slots from logins
+        user_id = await self._db.find_user_id_by(reset_token=reset_token)
+        if user_id is None:
+            raise ValueError("No user found with the provided reset token")
+
+        hashed_password = await get_hashing_service().hash_password_async(
+            password)
+        if not await self._db.update_user_by({'id': user_id,
+                                              'reset_token': reset_token},
+                                             hashed_password=hashed_password,
+                                             reset_token=None):
+            raise ValueError("No user found with the provided reset token")
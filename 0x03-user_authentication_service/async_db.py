@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+This module contains the AsyncDB class, the asyncio counterpart of DB
+used by the ASGI application.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import event, literal, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
+import migrations
+from db import DB, set_sqlite_pragmas
+from user import User
+from user_session import UserSession
+
+
+def async_url(url: str) -> str:
+    """
+    Return the asyncio driver URL of a database URL
+    (sqlite:///a.db -> sqlite+aiosqlite:///a.db).
+    """
+
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+class AsyncDB:
+    """
+    The AsyncDB class provides coroutines for interacting with the user
+    database; each call uses its own short-lived session.
+    """
+
+    def __init__(self, url: str = None) -> None:
+        """
+        Initialize a new AsyncDB instance on the given URL
+        (default: ASYNC_DB_URL, or the asyncio driver of DB_URL).
+        """
+
+        url = url or os.getenv("ASYNC_DB_URL") or async_url(
+            os.getenv("DB_URL", "sqlite:///a.db"))
+        options = {"pool_pre_ping": True}
+        connect_args = {}
+        if url.startswith("sqlite"):
+            connect_args = {"timeout": 30}
+        else:
+            options["pool_size"] = int(os.getenv("DB_POOL_SIZE", "5"))
+            options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self._engine = create_async_engine(url, connect_args=connect_args,
+                                           **options)
+        if url.startswith("sqlite"):
+            event.listen(self._engine.sync_engine, "connect",
+                         set_sqlite_pragmas)
+        self._sessionmaker = sessionmaker(self._engine, class_=AsyncSession,
+                                          expire_on_commit=False)
+
+    async def init(self, reset: bool = None) -> None:
+        """
+        Migrate the schema to the latest version
+        (after dropping every table with reset, default: DB_RESET=1).
+        """
+
+        if reset is None:
+            reset = os.getenv("DB_RESET") == "1"
+        async with self._engine.begin() as connection:
+            if reset:
+                await connection.run_sync(migrations.reset)
+            await connection.run_sync(migrations.upgrade)
+
+    async def close(self) -> None:
+        """
+        Close all the connections of the pool.
+        """
+
+        await self._engine.dispose()
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """
+        Add a new user to the database.
+        Raise ValueError if the email is already registered.
+        """
+
+        user = User(email=email, hashed_password=hashed_password)
+        async with self._sessionmaker() as session:
+            session.add(user)
+            try:
+                await session.commit()
+            except IntegrityError:
+                raise ValueError(f"User {email} already exists")
+        return user
+
+    async def find_user_by(self, **kwargs) -> User:
+        """
+        Find a user in the database based on the provided arguments.
+        """
+
+        async with self._sessionmaker() as session:
+            try:
+                result = await session.execute(
+                    select(User).filter_by(**kwargs))
+            except InvalidRequestError:
+                raise InvalidRequestError("Invalid query arguments provided.")
+            user = result.scalars().one_or_none()
+        if user is None:
+            raise NoResultFound("No user found with the provided arguments.")
+        return user
+
+    async def find_user_id_by(self, **kwargs) -> Optional[int]:
+        """
+        Find the ID of a user based on the provided arguments, selecting
+        only the ID (an index-only lookup on indexed columns); None if
+        there is no such user.
+        """
+
+        DB._check_columns(kwargs)
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(User.id).filter_by(**kwargs).limit(1))
+            return result.scalar_one_or_none()
+
+    async def update_user_by(self, filters: Dict, **kwargs) -> int:
+        """
+        Update the attributes of the users matching filters in a single
+        UPDATE statement, and return how many users were updated.
+        """
+
+        DB._check_columns(filters)
+        DB._check_columns(kwargs)
+        if not kwargs:
+            return 0
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                update(User).filter_by(**filters).values(**kwargs)
+                .execution_options(synchronize_session=False))
+            await session.commit()
+        return result.rowcount
+
+    async def add_session_for_email(self, email: str, session_id: str,
+                                    user_agent_hash: str = None) -> bool:
+        """
+        Add a session for the user with the given email in a single
+        INSERT ... SELECT statement; False if there is no such user.
+        """
+
+        now = datetime.utcnow()
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                UserSession.__table__.insert().from_select(
+                    ['id', 'user_id', 'created_at', 'last_seen_at',
+                     'user_agent_hash'],
+                    select(literal(session_id), User.id, literal(now),
+                           literal(now), literal(user_agent_hash)).where(
+                        User.email == email)))
+            await session.commit()
+        return result.rowcount > 0
+
+    async def find_user_by_session_id(self, session_id: str,
+                                      touch_interval: int = 60) -> User:
+        """
+        Find the user of a session with one indexed join, and update the
+        session's last_seen_at if it is older than touch_interval seconds.
+        """
+
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(User, UserSession.last_seen_at).join(
+                    UserSession, UserSession.user_id == User.id).where(
+                    UserSession.id == session_id))
+            row = result.one_or_none()
+            if row is None:
+                raise NoResultFound("No session found with the provided ID.")
+
+            user, last_seen_at = row
+            now = datetime.utcnow()
+            if last_seen_at < now - timedelta(seconds=touch_interval):
+                await session.execute(
+                    update(UserSession).where(UserSession.id == session_id)
+                    .values(last_seen_at=now)
+                    .execution_options(synchronize_session=False))
+                await session.commit()
+        return user
+
+    async def list_sessions(self, user_id: int) -> List[UserSession]:
+        """
+        List the sessions of a user, oldest first.
+        """
+
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(UserSession).where(UserSession.user_id == user_id)
+                .order_by(UserSession.created_at))
+            return list(result.scalars())
+
+    async def delete_session(self, session_id: str,
+                             user_id: int = None) -> bool:
+        """
+        Delete a session (only if it belongs to user_id, when given).
+        """
+
+        statement = UserSession.__table__.delete().where(
+            UserSession.id == session_id)
+        if user_id is not None:
+            statement = statement.where(UserSession.user_id == user_id)
+        async with self._sessionmaker() as session:
+            result = await session.execute(statement)
+            await session.commit()
+        return result.rowcount > 0
+
+    async def delete_user_sessions(self, user_id: int) -> int:
+        """
+        Delete all the sessions of a user, returning how many there were.
+        """
+
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                UserSession.__table__.delete().where(
+                    UserSession.user_id == user_id))
+            await session.commit()
+        return result.rowcount
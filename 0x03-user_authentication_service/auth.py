@@ -2,12 +2,15 @@
 """
 This module provides functions for user authentication.
 """
-import bcrypt
+import hashlib
+import os
 from sqlalchemy.orm.exc import NoResultFound
 from db import DB
+from hashing_service import get_hashing_service
 from user import User
+from user_session import UserSession
 from uuid import uuid4
-from typing import Union
+from typing import List, Union
 
 
 def _hash_password(password: str) -> bytes:
@@ -15,7 +18,7 @@ def _hash_password(password: str) -> bytes:
     Hashes a password using bcrypt.
     """
 
-    hashed_password = bcrypt.hashpw(str.encode(password), bcrypt.gensalt())
+    hashed_password = get_hashing_service().hash_password(password)
     return hashed_password
 
 
@@ -35,20 +38,20 @@ class Auth:
     def __init__(self):
         self._db = DB()
 
+    def teardown(self) -> None:
+        """
+        Release the database session of the current thread.
+        """
+
+        self._db.remove_session()
+
     def register_user(self, email: str, password: str) -> User:
         """
         Register a new user.
         """
 
-        try:
-            existing_user = self._db.find_user_by(email=email)
-            if existing_user:
-                raise ValueError(f"User {email} already exists")
-        except NoResultFound:
-            hashed_password = _hash_password(password)
-
-            user = self._db.add_user(email, hashed_password)
-            return user
+        hashed_password = _hash_password(password)
+        return self._db.add_user(email, hashed_password)
 
     def valid_login(self, email: str, password: str) -> bool:
         """
@@ -57,24 +60,27 @@ class Auth:
 
         try:
             user = self._db.find_user_by(email=email)
-            return bcrypt.checkpw(str.encode(password), user.hashed_password)
+            return get_hashing_service().check_password(
+                password, user.hashed_password)
         except NoResultFound:
             return False
 
-    def create_session(self, email: str) -> str:
+    def create_session(self, email: str, user_agent: str = None) -> str:
         """
         Create a session for the user with the given email.
+        The user's other sessions (other devices) stay valid.
         """
 
-        try:
-            user = self._db.find_user_by(email=email)
-            session_id = _generate_uuid()
-            self._db.update_user(user.id, session_id=session_id)
-
-            return session_id
-        except NoResultFound:
+        session_id = _generate_uuid()
+        user_agent_hash = None
+        if user_agent:
+            user_agent_hash = hashlib.sha256(user_agent.encode()).hexdigest()
+        if not self._db.add_session_for_email(email, session_id,
+                                              user_agent_hash):
             return None
 
+        return session_id
+
     def get_user_from_session_id(self, session_id: str) -> Union[User, None]:
         """
         Retrieve a user object based on the provided session ID.
@@ -84,41 +90,59 @@ class Auth:
             return None
 
         try:
-            user = self._db.find_user_by(session_id=session_id)
+            user = self._db.find_user_by_session_id(
+                session_id,
+                int(os.getenv('SESSION_TOUCH_INTERVAL', '60')))
             return user
         except NoResultFound:
             return None
 
-    def destroy_session(self, user_id: int) -> None:
+    def destroy_session(self, user_id: int, session_id: str = None) -> None:
         """
-        Destroy the session for the given user.
+        Destroy the given session of the user,
+        or all of the user's sessions if no session ID is given.
         """
 
-        self._db.update_user(user_id, session_id=None)
+        if session_id is None:
+            self._db.delete_user_sessions(user_id)
+        else:
+            self._db.delete_session(session_id, user_id)
+
+    def list_sessions(self, user_id: int) -> List[UserSession]:
+        """
+        List the sessions of the given user.
+        """
+
+        return self._db.list_sessions(user_id)
 
     def get_reset_password_token(self, email: str) -> str:
         """
         Retrieves a reset password token for the user with the given email.
         """
 
-        try:
-            user = self._db.find_user_by(email=email)
-            reset_token = _generate_uuid()
-            self._db.update_user(user.id, reset_token=reset_token)
-            return reset_token
-        except NoResultFound:
+        reset_token = _generate_uuid()
+        if not self._db.update_user_by({'email': email},
+                                       reset_token=reset_token):
             raise ValueError(f"No user found with the email {email}")
+        return reset_token
 
     def update_password(self, reset_token: str, password: str) -> None:
         """
         Update the password for a user using a reset token.
         """
 
-        try:
-            user = self._db.find_user_by(reset_token=reset_token)
-            hashed_password = _hash_password(password)
-            self._db.update_user(user.id,
-                                 hashed_password=hashed_password,
-                                 reset_token=None)
-        except NoResultFound:
+        if not reset_token:
+            raise ValueError(f"No user found with the provided reset token")
+
+        # check the token before paying for a hash: bogus tokens must
+        # not take hashing slots from logins
+        user_id = self._db.find_user_id_by(reset_token=reset_token)
+        if user_id is None:
+            raise ValueError(f"No user found with the provided reset token")
+
+        hashed_password = _hash_password(password)
+        if not self._db.update_user_by({'id': user_id,
+                                        'reset_token': reset_token},
+                                       hashed_password=hashed_password,
+                                       reset_token=None):
             raise ValueError(f"No user found with the provided reset token")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+This module compares servers of the user authentication service (e.g.
+app.py under a WSGI server and asgi_app.py under an ASGI server):
+for each URL it opens idle keep-alive connections, then measures
+/profile throughput and latency while they stay open.
+
+Usage: ./bench_asgi.py [--idle N] [--clients N] [--requests N] URL [URL ...]
+"""
+import argparse
+import socket
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from uuid import uuid4
+
+import requests
+
+
+def open_idle_connections(url: str, count: int) -> list:
+    """
+    Open count keep-alive connections, each having served one request.
+    """
+
+    parsed = urlparse(url)
+    connections = []
+    for _ in range(count):
+        try:
+            sock = socket.create_connection(
+                (parsed.hostname, parsed.port or 80), timeout=10)
+            sock.sendall(f"GET / HTTP/1.1\r\nHost: {parsed.netloc}\r\n"
+                         "Connection: keep-alive\r\n\r\n".encode())
+            if not sock.recv(4096):
+                sock.close()
+                break
+        except OSError:
+            break
+        connections.append(sock)
+    return connections
+
+
+def log_in(url: str) -> str:
+    """
+    Register a new user and return a session ID.
+    """
+
+    email, password = f"{uuid4()}@bench.io", "bench"
+    data = {'email': email, 'password': password}
+    requests.post(f"{url}/users", data=data).raise_for_status()
+    response = requests.post(f"{url}/sessions", data=data)
+    response.raise_for_status()
+    return response.cookies['session_id']
+
+
+def run_client(url: str, session_id: str, count: int) -> list:
+    """
+    Send count /profile requests on one pooled connection and
+    return their latencies (None for errors).
+    """
+
+    latencies = []
+    with requests.Session() as session:
+        session.cookies.set('session_id', session_id)
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                ok = session.get(f"{url}/profile", timeout=30).ok
+            except requests.RequestException:
+                ok = False
+            latencies.append(time.perf_counter() - start if ok else None)
+    return latencies
+
+
+def bench(url: str, idle: int, clients: int, count: int) -> None:
+    """
+    Benchmark one server and print the results.
+    """
+
+    session_id = log_in(url)
+    connections = open_idle_connections(url, idle)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            results = executor.map(lambda _: run_client(url, session_id,
+                                                        count),
+                                   range(clients))
+            latencies = [latency for result in results for latency in result]
+        elapsed = time.perf_counter() - start
+    finally:
+        for sock in connections:
+            sock.close()
+
+    ok = sorted(latency for latency in latencies if latency is not None)
+    quantiles = statistics.quantiles(ok, n=100) if len(ok) > 1 else [0] * 99
+    print(f"{url}: {len(connections)}/{idle} idle connections held, "
+          f"{len(ok) / elapsed:.0f} req/s, "
+          f"p50 {quantiles[49] * 1000:.1f} ms, "
+          f"p99 {quantiles[98] * 1000:.1f} ms, "
+          f"{len(latencies) - len(ok)} errors")
+
+
+def main() -> None:
+    """
+    Benchmark each URL given on the command line.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("urls", nargs="+", metavar="URL")
+    parser.add_argument("--idle", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+    for url in args.urls:
+        bench(url.rstrip("/"), args.idle, args.clients, args.requests)
+
+
+if __name__ == "__main__":
+    main()
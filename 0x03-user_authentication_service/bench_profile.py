@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+This module benchmarks GET /profile latency as the users and sessions
+tables grow, with and without their secondary indexes (the primary
+keys, which /profile relies on, are kept).
+
+Usage: ./bench_profile.py [--no-index] [size ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import String, cast, literal, select
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+REQUESTS = 200
+BATCH = 10000
+
+
+def seed(engine, size: int, start: int) -> None:
+    """
+    Insert users start..size-1, then a session for each user without one
+    (with the INSERT ... SELECT of DB.add_session_for_email, in bulk).
+    """
+
+    from user import User
+    from user_session import UserSession
+
+    for first in range(start, size, BATCH):
+        rows = [{"email": f"user{i}@example.com", "hashed_password": "x"}
+                for i in range(first, min(size, first + BATCH))]
+        with engine.begin() as connection:
+            connection.execute(User.__table__.insert(), rows)
+
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(UserSession.__table__.insert().from_select(
+            ['id', 'user_id', 'created_at', 'last_seen_at'],
+            select(literal("seed-") + cast(User.id, String), User.id,
+                   literal(now), literal(now)).where(
+                User.id.notin_(select(UserSession.user_id)))))
+
+
+def main() -> None:
+    """
+    Grow the users table through the sizes and time /profile at each.
+    """
+
+    args = sys.argv[1:]
+    with_index = "--no-index" not in args
+    sizes = [int(arg) for arg in args if arg != "--no-index"]
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DB_URL"] = f"sqlite:///{db_path}"
+    from app import app, AUTH
+    from user import User
+    from user_session import UserSession
+
+    engine = AUTH._db._engine
+    if not with_index:
+        for table in (User.__table__, UserSession.__table__):
+            for index in table.indexes:
+                index.drop(bind=engine)
+
+    client = app.test_client()
+    seeded = 0
+    for size in sizes or DEFAULT_SIZES:
+        seed(engine, size, seeded)
+        seeded = size
+        step = max(1, size // REQUESTS)
+        session_ids = [AUTH.create_session(f"user{i}@example.com")
+                       for i in range(0, size, step)]
+        start = time.perf_counter()
+        for session_id in session_ids:
+            client.set_cookie("session_id", session_id)
+            assert client.get("/profile").status_code == 200
+        elapsed = time.perf_counter() - start
+        print(f"{size:>9} users: /profile "
+              f"{elapsed / len(session_ids) * 1000:8.3f} ms"
+              f" ({'indexed' if with_index else 'no index'})")
+
+
+if __name__ == "__main__":
+    main()
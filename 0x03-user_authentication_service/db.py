@@ -2,12 +2,59 @@
 """
 This module contains the DB class for managing user data in an SQLite database.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, event, literal, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
-from user import Base, User
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.pool import QueuePool, StaticPool
+import migrations
+from user import User
+from user_session import UserSession
+
+
+def _create_engine(url: str) -> Engine:
+    """
+    Create the engine of the given URL, pool sized by DB_POOL_SIZE and
+    DB_MAX_OVERFLOW. SQLite connections may be used by any request thread,
+    wait on locks instead of failing, and use the WAL journal so readers
+    don't block the writer.
+    """
+
+    options = {"pool_pre_ping": True}
+    connect_args = {}
+    is_sqlite = url.startswith("sqlite")
+    if is_sqlite:
+        connect_args = {"check_same_thread": False, "timeout": 30}
+    if is_sqlite and (url in ("sqlite://", "sqlite:///:memory:")):
+        options["poolclass"] = StaticPool
+    else:
+        options["poolclass"] = QueuePool
+        options["pool_size"] = int(os.getenv("DB_POOL_SIZE", "5"))
+        options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+    engine = create_engine(url, connect_args=connect_args, **options)
+
+    if is_sqlite:
+        event.listen(engine, "connect", set_sqlite_pragmas)
+
+    return engine
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Configure a new SQLite connection: WAL journal and foreign keys.
+    """
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
 
 class DB:
@@ -15,35 +62,65 @@ class DB:
     The DB class provides methods for interacting with the user database.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, url: str = None, reset: bool = None) -> None:
         """
-        Initialize a new DB instance.
+        Initialize a new DB instance on the given URL
+        (default: DB_URL, or sqlite:///a.db).
+
+        The schema is migrated to the latest version, keeping the data.
+        With reset (default: DB_RESET=1), every table is dropped first,
+        e.g. to start tests from an empty database.
         """
 
-        self._engine = create_engine("sqlite:///a.db")
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        self._engine = _create_engine(url or os.getenv("DB_URL",
+                                                       "sqlite:///a.db"))
+        if reset is None:
+            reset = os.getenv("DB_RESET") == "1"
+        if reset:
+            migrations.reset(self._engine)
+        migrations.migrate(self._engine)
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
 
     @property
     def _session(self) -> Session:
         """
-        Memoized session object.
+        Session of the current thread.
+        """
+
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """
+        Close the session of the current thread, rolling back
+        anything left uncommitted.
         """
 
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        self.__session.remove()
+
+    def _commit(self) -> None:
+        """
+        Commit the session of the current thread, rolling back on failure.
+        """
+
+        try:
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
         Add a new user to the database.
+        Raise ValueError if the email is already registered
+        (relying on the unique index, without a prior SELECT).
         """
 
         user = User(email=email, hashed_password=hashed_password)
         self._session.add(user)
-        self._session.commit()
+        try:
+            self._commit()
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
         return user
 
     def find_user_by(self, **kwargs) -> User:
@@ -59,17 +136,149 @@ class DB:
         except InvalidRequestError:
             raise InvalidRequestError("Invalid query arguments provided.")
 
-    def update_user(self, user_id: int, **kwargs) -> None:
+    def find_user_id_by(self, **kwargs) -> Optional[int]:
         """
-        Update the attributes of a user.
+        Find the ID of a user based on the provided arguments, selecting
+        only the ID (an index-only lookup on indexed columns); None if
+        there is no such user.
         """
 
-        user = self.find_user_by(id=user_id)
-        for key, value in kwargs.items():
-            if not hasattr(user, key):
+        self._check_columns(kwargs)
+        row = self._session.query(User.id).filter_by(**kwargs).first()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _check_columns(values: Dict) -> None:
+        """
+        Raise ValueError if a key is not a column of the users table.
+        """
+
+        for key in values:
+            if key not in User.__table__.columns:
                 raise ValueError(
                     f"{key} is not an attribute of the User class"
                     )
-            setattr(user, key, value)
 
-        self._session.commit()
+    def update_user(self, user_id: int, **kwargs) -> None:
+        """
+        Update the attributes of a user.
+        """
+
+        if not kwargs:
+            if self.find_user_id_by(id=user_id) is None:
+                raise NoResultFound(
+                    "No user found with the provided arguments.")
+            return
+        if self.update_user_by({'id': user_id}, **kwargs) == 0:
+            raise NoResultFound("No user found with the provided arguments.")
+
+    def update_user_by(self, filters: Dict, **kwargs) -> int:
+        """
+        Update the attributes of the users matching filters in a single
+        UPDATE statement, and return how many users were updated.
+        """
+
+        self._check_columns(filters)
+        self._check_columns(kwargs)
+        if not kwargs:
+            return 0
+        updated = self._session.query(User).filter_by(**filters).update(
+            kwargs, synchronize_session=False)
+        self._commit()
+        return updated
+
+    def update_users(self, rows: List[Dict]) -> None:
+        """
+        Update many users at once; each row holds the user's id and the
+        attributes to update.
+        """
+
+        for row in rows:
+            self._check_columns(row)
+        self._session.bulk_update_mappings(User, rows)
+        self._commit()
+
+    def add_session(self, user_id: int, session_id: str,
+                    user_agent_hash: str = None) -> UserSession:
+        """
+        Add a new session of a user.
+        """
+
+        user_session = UserSession(id=session_id, user_id=user_id,
+                                   user_agent_hash=user_agent_hash)
+        self._session.add(user_session)
+        self._commit()
+        return user_session
+
+    def add_session_for_email(self, email: str, session_id: str,
+                              user_agent_hash: str = None) -> bool:
+        """
+        Add a session for the user with the given email in a single
+        INSERT ... SELECT statement; False if there is no such user.
+        """
+
+        now = datetime.utcnow()
+        inserted = self._session.execute(
+            UserSession.__table__.insert().from_select(
+                ['id', 'user_id', 'created_at', 'last_seen_at',
+                 'user_agent_hash'],
+                select(literal(session_id), User.id, literal(now),
+                       literal(now), literal(user_agent_hash)).where(
+                    User.email == email))).rowcount
+        self._commit()
+        return inserted > 0
+
+    def find_user_by_session_id(self, session_id: str,
+                                touch_interval: int = 60) -> User:
+        """
+        Find the user of a session with one indexed join, and update the
+        session's last_seen_at if it is older than touch_interval seconds.
+        """
+
+        row = self._session.query(User, UserSession.last_seen_at).join(
+            UserSession, UserSession.user_id == User.id).filter(
+            UserSession.id == session_id).one_or_none()
+        if row is None:
+            raise NoResultFound("No session found with the provided ID.")
+
+        user, last_seen_at = row
+        now = datetime.utcnow()
+        if last_seen_at < now - timedelta(seconds=touch_interval):
+            self._session.query(UserSession).filter(
+                UserSession.id == session_id).update(
+                {UserSession.last_seen_at: now},
+                synchronize_session=False)
+            self._commit()
+        return user
+
+    def list_sessions(self, user_id: int) -> List[UserSession]:
+        """
+        List the sessions of a user, oldest first.
+        """
+
+        return self._session.query(UserSession).filter(
+            UserSession.user_id == user_id).order_by(
+            UserSession.created_at).all()
+
+    def delete_session(self, session_id: str, user_id: int = None) -> bool:
+        """
+        Delete a session (only if it belongs to user_id, when given).
+        """
+
+        query = self._session.query(UserSession).filter(
+            UserSession.id == session_id)
+        if user_id is not None:
+            query = query.filter(UserSession.user_id == user_id)
+        deleted = query.delete(synchronize_session=False)
+        self._commit()
+        return deleted > 0
+
+    def delete_user_sessions(self, user_id: int) -> int:
+        """
+        Delete all the sessions of a user, returning how many there were.
+        """
+
+        deleted = self._session.query(UserSession).filter(
+            UserSession.user_id == user_id).delete(synchronize_session=False)
+        self._commit()
+        return deleted
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+This module provides a bcrypt hashing service running hashes on a bounded
+worker pool, so bursts of logins queue up instead of starving the
+request threads.
+"""
+import asyncio
+import collections
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+import bcrypt
+
+
+class HashingBusyError(RuntimeError):
+    """
+    Raised when no hashing slot frees up within the service timeout.
+    """
+
+
+class HashingService:
+    """
+    Runs bcrypt on a thread pool (bcrypt releases the GIL while hashing).
+
+    At most max_pending hashes are queued or running; callers wait up to
+    timeout seconds (None: forever) for a slot, then get HashingBusyError.
+    Coroutines wait for a slot on their event loop, woken when a hash
+    finishes, so a cancelled coroutine holds neither a slot nor a thread.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = None,
+                 max_pending: int = None, timeout: float = None) -> None:
+        """
+        Initialize a new HashingService.
+        """
+
+        max_workers = max_workers or os.cpu_count() or 1
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(
+            max_pending or 4 * max_workers)
+        # (event loop, future) of the coroutines waiting for a slot
+        self._waiters = collections.deque()
+        self._waiters_lock = threading.Lock()
+
+    def _hash(self, password: str) -> bytes:
+        """
+        Hash a password with the configured work factor.
+        """
+
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds))
+
+    @staticmethod
+    def _check(password: str, hashed_password: bytes) -> bool:
+        """
+        Check a password against a bcrypt hash.
+        """
+
+        return bcrypt.checkpw(password.encode(), hashed_password)
+
+    def _submit(self, func: Callable, *args) -> Future:
+        """
+        Run func on the pool once a slot is available.
+        """
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusyError("Too many pending password hashes")
+        return self._submit_acquired(func, *args)
+
+    def _submit_acquired(self, func: Callable, *args) -> Future:
+        """
+        Run func on the pool, the slot being already acquired.
+        """
+
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        """
+        Release a slot and wake a coroutine waiting for one.
+        """
+
+        self._slots.release()
+        self._wake_waiter()
+
+    def _wake_waiter(self) -> None:
+        """
+        Wake the first coroutine still waiting for a slot, if any.
+        """
+
+        with self._waiters_lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if waiter.done():
+                    continue
+                try:
+                    loop.call_soon_threadsafe(self._wake, waiter)
+                except RuntimeError:
+                    continue  # its event loop is closed
+                return
+
+    def _wake(self, waiter: asyncio.Future) -> None:
+        """
+        Wake a waiting coroutine, from its event loop; if it was
+        cancelled meanwhile, wake the next one instead.
+        """
+
+        if waiter.done():
+            self._wake_waiter()
+        else:
+            waiter.set_result(None)
+
+    async def _acquire_async(self) -> None:
+        """
+        Wait for a slot without blocking the event loop.
+        """
+
+        if self._slots.acquire(blocking=False):
+            return
+        loop = asyncio.get_running_loop()
+        deadline = None if self.timeout is None \
+            else loop.time() + self.timeout
+        while True:
+            waiter = loop.create_future()
+            with self._waiters_lock:
+                self._waiters.append((loop, waiter))
+            # a slot may have been released before the waiter was queued
+            if self._slots.acquire(blocking=False):
+                waiter.cancel()
+                return
+            timeout = None if deadline is None else deadline - loop.time()
+            try:
+                if timeout is not None and timeout <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                waiter.cancel()
+                raise HashingBusyError("Too many pending password hashes")
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # pass on the wake-up this coroutine won't use
+                    self._wake_waiter()
+                raise
+
+    async def _submit_async(self, func: Callable, *args):
+        """
+        Run func on the pool without blocking the event loop.
+        """
+
+        await self._acquire_async()
+        return await asyncio.wrap_future(self._submit_acquired(func, *args))
+
+    def hash_password(self, password: str) -> bytes:
+        """
+        Hash a password.
+        """
+
+        return self._submit(self._hash, password).result()
+
+    def check_password(self, password: str, hashed_password: bytes) -> bool:
+        """
+        Check if a password matches a hashed password.
+        """
+
+        return self._submit(self._check, password, hashed_password).result()
+
+    async def hash_password_async(self, password: str) -> bytes:
+        """
+        Hash a password from a coroutine.
+        """
+
+        return await self._submit_async(self._hash, password)
+
+    async def check_password_async(self, password: str,
+                                   hashed_password: bytes) -> bool:
+        """
+        Check a password against a hashed password from a coroutine.
+        """
+
+        return await self._submit_async(self._check, password,
+                                        hashed_password)
+
+    def shutdown(self) -> None:
+        """
+        Wait for the running hashes and stop the workers.
+        """
+
+        self._executor.shutdown(wait=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_hashing_service() -> HashingService:
+    """
+    Return the process-wide hashing service, configured from
+    BCRYPT_ROUNDS, HASHING_WORKERS, HASHING_MAX_PENDING and
+    HASHING_TIMEOUT (seconds).
+    """
+
+    global _service
+
+    with _service_lock:
+        if _service is None:
+            timeout = os.getenv('HASHING_TIMEOUT')
+            _service = HashingService(
+                rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+                max_workers=int(os.getenv('HASHING_WORKERS', '0')) or None,
+                max_pending=int(os.getenv('HASHING_MAX_PENDING', '0'))
+                or None,
+                timeout=float(timeout) if timeout else None)
+        return _service
@@ -1,8 +1,24 @@
 #!/usr/bin/env python3
 """
 This module contains functions for user authentication and profile management.
+
+Run without arguments, it checks the whole flow once as a single user
+(a new email on each run, so no DB_RESET=1 is needed between runs).
+With --load, it drives the same flow with concurrent virtual users and
+reports per-endpoint throughput, latency percentiles and error rates:
+
+    ./main.py --load [--users N] [--iterations N] [--url URL | --in-process]
 """
 
+import argparse
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from typing import Dict, List, Tuple
+from uuid import uuid4
+
 import requests
 
 URL = 'http://localhost:5000'
@@ -94,7 +110,7 @@ def log_out(session_id: str) -> None:
     if not session_id:
         assert response.status_code == 403
     else:
-        assert response.url == 'http://localhost:5000/'
+        assert response.url == f'{URL}/'
         assert response.status_code == 200
         assert response.json() == {"message": "Bienvenue"}
 
@@ -142,13 +158,246 @@ PASSWD = "b4l0u"
 NEW_PASSWD = "t4rt1fl3tt3"
 
 
-if __name__ == "__main__":
-    register_user(EMAIL, PASSWD)
-    log_in_wrong_password(EMAIL, NEW_PASSWD)
+class HTTPClient:
+    """
+    Sends the requests of one virtual user to a running server
+    on a pooled keep-alive connection.
+    """
+
+    def __init__(self, url: str) -> None:
+        """
+        Initialize a new HTTPClient for the server at url.
+        """
+
+        self.url = url
+        self._session = requests.Session()
+
+    def request(self, method: str, path: str, data: Dict = None,
+                session_id: str = None) -> Tuple[int, Dict, str]:
+        """
+        Send a request and return its status code, JSON body
+        and session_id cookie.
+        """
+
+        cookies = {'session_id': session_id} if session_id else None
+        response = self._session.request(method, f'{self.url}{path}',
+                                         data=data, cookies=cookies,
+                                         timeout=60)
+        self._session.cookies.clear()
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return (response.status_code, body,
+                response.cookies.get('session_id'))
+
+    def close(self) -> None:
+        """
+        Close the pooled connection.
+        """
+
+        self._session.close()
+
+
+class InProcessClient:
+    """
+    Sends the requests of one virtual user to the Flask application
+    through its test client, without any network.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize a new InProcessClient.
+        """
+
+        from app import app
+
+        self._client = app.test_client(use_cookies=False)
+
+    def request(self, method: str, path: str, data: Dict = None,
+                session_id: str = None) -> Tuple[int, Dict, str]:
+        """
+        Send a request and return its status code, JSON body
+        and session_id cookie.
+        """
+
+        headers = {'Cookie': f'session_id={session_id}'} if session_id else {}
+        response = self._client.open(path, method=method, data=data,
+                                     headers=headers, follow_redirects=True)
+        cookie = SimpleCookie()
+        for header in response.headers.getlist('Set-Cookie'):
+            cookie.load(header)
+        morsel = cookie.get('session_id')
+        return (response.status_code, response.get_json(silent=True),
+                morsel.value if morsel else None)
+
+    def close(self) -> None:
+        """
+        Nothing to release.
+        """
+
+
+class LoadStats:
+    """
+    Collects the latencies and errors of each endpoint.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize empty statistics.
+        """
+
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, latency: float, ok: bool) -> None:
+        """
+        Record one request of an endpoint.
+        """
+
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(latency)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed: float) -> str:
+        """
+        Format the throughput, p50/p95/p99 latencies and error rate
+        of each endpoint over a run of elapsed seconds.
+        """
+
+        lines = [f"{'endpoint':<24}{'requests':>9}{'req/s':>9}"
+                 f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}"]
+        for endpoint, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            percentiles = "".join(
+                f"{percentile(latencies, p) * 1000:>9.1f}"
+                for p in (50, 95, 99))
+            error_rate = self.errors.get(endpoint, 0) / len(latencies)
+            lines.append(f"{endpoint:<24}{len(latencies):>9}"
+                         f"{len(latencies) / elapsed:>9.1f}{percentiles}"
+                         f"{error_rate:>9.1%}")
+        return "\n".join(lines)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Return the p-th percentile (nearest rank) of sorted values.
+    """
+
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(len(values) * p / 100))
+    return values[rank - 1]
+
+
+def timed_request(client, stats: LoadStats, method: str, path: str,
+                  data: Dict = None,
+                  session_id: str = None) -> Tuple[Dict, str]:
+    """
+    Send a request through client and record its latency and whether it
+    succeeded (status 200). Return its JSON body and session_id cookie,
+    or (None, None) if it failed.
+    """
+
+    start = time.perf_counter()
+    try:
+        status, body, cookie = client.request(method, path, data,
+                                              session_id)
+        ok = status == 200
+    except requests.RequestException:
+        ok = False
+    stats.record(f'{method} {path}', time.perf_counter() - start, ok)
+    return (body, cookie) if ok else (None, None)
+
+
+def virtual_user(client, stats: LoadStats, iterations: int) -> None:
+    """
+    Run the register, login, profile, logout and reset password flow
+    iterations times, with a new user each time.
+    """
+
+    try:
+        for _ in range(iterations):
+            email = f'{uuid4()}@load.test'
+            data = {'email': email, 'password': PASSWD}
+            body, _ = timed_request(client, stats, 'POST', '/users', data)
+            if body is None:
+                continue
+
+            _, session_id = timed_request(client, stats, 'POST',
+                                          '/sessions', data)
+            if session_id:
+                timed_request(client, stats, 'GET', '/profile',
+                              session_id=session_id)
+                timed_request(client, stats, 'DELETE', '/sessions',
+                              session_id=session_id)
+
+            body, _ = timed_request(client, stats, 'POST', '/reset_password',
+                                    {'email': email})
+            if body is not None:
+                timed_request(client, stats, 'PUT', '/reset_password',
+                              {'email': email,
+                               'reset_token': body.get('reset_token'),
+                               'new_password': NEW_PASSWD})
+    finally:
+        client.close()
+
+
+def run_load(users: int, iterations: int, in_process: bool = False) -> None:
+    """
+    Run the flow with concurrent virtual users, against the server at URL
+    or in-process through the Flask test client, and print the results.
+    """
+
+    stats = LoadStats()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(users) as executor:
+        futures = [executor.submit(
+            virtual_user,
+            InProcessClient() if in_process else HTTPClient(URL),
+            stats, iterations) for _ in range(users)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    target = 'in-process' if in_process else URL
+    print(f"{users} virtual users x {iterations} iterations against "
+          f"{target} in {elapsed:.1f}s")
+    print(stats.report(elapsed))
+
+
+def check_flow() -> None:
+    """
+    Check the whole flow once as a single user, with a new email on each
+    run so that it passes again against a persistent database.
+    """
+
+    email = EMAIL.replace("@", f"+{uuid4().hex[:8]}@")
+    register_user(email, PASSWD)
+    log_in_wrong_password(email, NEW_PASSWD)
     profile_unlogged()
-    session_id = log_in(EMAIL, PASSWD)
+    session_id = log_in(email, PASSWD)
     profile_logged(session_id)
     log_out(session_id)
-    reset_token = reset_password_token(EMAIL)
-    update_password(EMAIL, reset_token, NEW_PASSWD)
-    log_in(EMAIL, NEW_PASSWD)
+    reset_token = reset_password_token(email)
+    update_password(email, reset_token, NEW_PASSWD)
+    log_in(email, NEW_PASSWD)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--load", action="store_true",
+                        help="run the flow with concurrent virtual users")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--in-process", action="store_true",
+                        help="use the Flask test client instead of --url")
+    args = parser.parse_args()
+    URL = args.url.rstrip("/")
+
+    if args.load:
+        run_load(args.users, args.iterations, args.in_process)
+    else:
+        check_flow()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+This module contains the versioned schema migrations of the database.
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple, Union
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table
+from sqlalchemy import literal, select
+from sqlalchemy.engine import Connection, Engine
+from user import Base, User
+from user_session import UserSession
+
+_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('version', Integer, nullable=False),
+)
+
+
+def _create_users_table(connection: Connection) -> None:
+    """
+    Version 1: the users table.
+    """
+
+    User.__table__.create(bind=connection, checkfirst=True)
+
+
+def _create_users_indexes(connection: Connection) -> None:
+    """
+    Version 2: the indexes of the users table.
+    """
+
+    for index in User.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+def _create_sessions_table(connection: Connection) -> None:
+    """
+    Version 3: the sessions table, filled with the sessions
+    stored in users.session_id so nobody is logged out.
+    """
+
+    UserSession.__table__.create(bind=connection, checkfirst=True)
+    now = literal(datetime.utcnow(), DateTime)
+    connection.execute(UserSession.__table__.insert().from_select(
+        ['id', 'user_id', 'created_at', 'last_seen_at'],
+        select(User.session_id, User.id, now, now).where(
+            User.session_id.isnot(None))))
+
+
+MIGRATIONS: List[Tuple[int, Callable[[Connection], None]]] = [
+    (1, _create_users_table),
+    (2, _create_users_indexes),
+    (3, _create_sessions_table),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(connection: Connection) -> int:
+    """
+    Return the schema version of the database, 0 if it has none.
+    """
+
+    schema_version.create(bind=connection, checkfirst=True)
+    version = connection.execute(select(schema_version.c.version)).scalar()
+    return version or 0
+
+
+def upgrade(connection: Connection) -> int:
+    """
+    Apply the migrations newer than the schema version of the database
+    and return the new version.
+    """
+
+    version = get_version(connection)
+    if version >= LATEST_VERSION:
+        return version
+
+    for migration_version, migration in MIGRATIONS:
+        if migration_version > version:
+            migration(connection)
+    connection.execute(schema_version.delete())
+    connection.execute(schema_version.insert().values(
+        version=LATEST_VERSION))
+    return LATEST_VERSION
+
+
+def migrate(engine: Engine) -> int:
+    """
+    Upgrade the database in one transaction and return the new version.
+    """
+
+    with engine.begin() as connection:
+        return upgrade(connection)
+
+
+def reset(bind: Union[Engine, Connection]) -> None:
+    """
+    Drop every table, schema version included.
+    """
+
+    Base.metadata.drop_all(bind)
+    _metadata.drop_all(bind)
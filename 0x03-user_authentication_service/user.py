@@ -4,7 +4,7 @@ This module defines the User class.
 """
 
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 
 Base = declarative_base()
 
@@ -13,11 +13,15 @@ class User(Base):
     """
     Represents a user.
 
+    Lookups by email, session ID and reset token go through unique
+    indexes (partial on the nullable columns where supported).
+
     Attributes:
         id (int): The unique identifier for the user.
         email (str): The email address of the user.
         hashed_password (str): The hashed password of the user.
-        session_id (str, optional): The session ID of the user.
+        session_id (str, optional): Legacy single session ID of the user,
+            superseded by the sessions table (see user_session.py).
         reset_token (str, optional): The reset token of the user.
     """
 
@@ -28,3 +32,13 @@ class User(Base):
     hashed_password = Column(String(250))
     session_id = Column(String(250), nullable=True)
     reset_token = Column(String(250), nullable=True)
+
+    __table_args__ = (
+        Index('ix_users_email', email, unique=True),
+        Index('ix_users_session_id', session_id, unique=True,
+              sqlite_where=session_id.isnot(None),
+              postgresql_where=session_id.isnot(None)),
+        Index('ix_users_reset_token', reset_token, unique=True,
+              sqlite_where=reset_token.isnot(None),
+              postgresql_where=reset_token.isnot(None)),
+    )
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+This module defines the UserSession class.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from user import Base
+
+
+class UserSession(Base):
+    """
+    Represents a session of a user, one per logged-in device.
+
+    Attributes:
+        id (str): The session ID.
+        user_id (int): The ID of the user.
+        created_at (datetime): When the session was created.
+        last_seen_at (datetime): When the session was last used
+            (updated at most once per touch interval).
+        user_agent_hash (str, optional): SHA256 of the client User-Agent.
+    """
+
+    __tablename__ = 'sessions'
+
+    id = Column(String(250), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_seen_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    user_agent_hash = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index('ix_sessions_user_id', user_id),
+    )